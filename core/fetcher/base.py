@@ -1,10 +1,30 @@
+import asyncio
+import copy
+import datetime
 from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Tuple, Union
 
 import pandas as pd
 
+from utils.log import logger
+
+from .http import async_client, session
+from .indicators import IndicatorEngine
+from .resample import PERIOD_FREQS, period_start, resample_bars
+from .store import BarStore
+
 
 class DataFetcher(ABC):
-    def __init__(self, name: str, symbol: str, start_date: str, end_date: str, period: str = "daily", adjust: str = ""):
+    def __init__(
+        self,
+        name: str,
+        symbol: str,
+        start_date: str,
+        end_date: str,
+        period: str = "daily",
+        adjust: str = "",
+        store_dir: Optional[str] = "cache/bars",
+    ):
         self.name = name
         self.symbol = symbol
         self.start_date = start_date
@@ -12,68 +32,210 @@ class DataFetcher(ABC):
         self.adjust = adjust
         self.period = period
         self.timeout = None
+        self.store = BarStore(store_dir) if store_dir else None
+        self.indicators = IndicatorEngine()
+        self._fqt: Optional[str] = None
 
     def calc_indicators(self, df: pd.DataFrame) -> pd.DataFrame:
-        df = df.copy()
-        df["index"] = pd.to_datetime(df["date"])
-        df.set_index("index", inplace=True)
-
-        df["MA5"] = df["close"].rolling(5).mean()
-        df["MA20"] = df["close"].rolling(20).mean()
-        df["MA60"] = df["close"].rolling(60).mean()
-        df["MA120"] = df["close"].rolling(120).mean()
-
-        df["Boll_Mid"] = df["close"].rolling(20).mean()
-        df["Boll_Std"] = df["close"].rolling(20).std()
-        df["Boll_Upper"] = df["Boll_Mid"] + 2 * df["Boll_Std"]
-        df["Boll_Lower"] = df["Boll_Mid"] - 2 * df["Boll_Std"]
-
-        df["EMA12"] = df["close"].ewm(span=12, adjust=False).mean()
-        df["EMA26"] = df["close"].ewm(span=26, adjust=False).mean()
-        df["DIF"] = df["EMA12"] - df["EMA26"]
-
-        df["DEA"] = df["DIF"].ewm(span=9, adjust=False).mean()
-        df["MACD"] = (df["DIF"] - df["DEA"]) * 2
-
-        df["change"] = df["close"].diff()
-        df["gain"] = df["change"].apply(lambda x: x if x > 0 else 0)
-        df["loss"] = df["change"].apply(lambda x: -x if x < 0 else 0)
-
-        window = 14
-        df["avg_gain"] = df["gain"].rolling(window).mean()
-        df["avg_loss"] = df["loss"].rolling(window).mean()
-        df["RSI14"] = 100 - (100 / (1 + (df["avg_gain"] / df["avg_loss"])))
-
-        df["VOL5"] = df["volume"].rolling(5).mean()
-        df["VOL10"] = df["volume"].rolling(10).mean()
-
-        return df[
-            [
-                "date",
-                "open",
-                "high",
-                "low",
-                "close",
-                "volume",
-                "MA5",
-                "MA20",
-                "MA60",
-                "MA120",
-                "Boll_Upper",
-                "Boll_Mid",
-                "Boll_Lower",
-                "DIF",
-                "DEA",
-                "MACD",
-                "RSI14",
-            ]
-        ]
+        return self.indicators.compute(df)
+
+    @staticmethod
+    def _compact_date(date: str) -> str:
+        return date[:10].replace("-", "")
+
+    def _slice_dates(self, df: pd.DataFrame, start_date: str, end_date: str) -> pd.DataFrame:
+        if df.empty:
+            return df
+        dates = df["date"].str[:10].str.replace("-", "")
+        return df[(dates >= start_date) & (dates <= end_date)].reset_index(drop=True)
+
+    @staticmethod
+    def _reference_bar(cached: pd.DataFrame) -> pd.Series:
+        """Return the newest stored bar that had closed when it was stored.
+
+        The last bar may have been stored mid-session, so its close is expected to change; the one before it
+        is final unless the history itself was rewritten.
+        """
+        return cached.iloc[-2] if len(cached) > 1 else cached.iloc[-1]
+
+    def _is_consistent(self, cached: pd.DataFrame, delta: pd.DataFrame) -> bool:
+        """Check the refetched reference bar against the store.
+
+        Adjusted prices (any ``fqt`` other than "0", which the futures request always sends) are rewritten on
+        ex-dividend dates and contract rolls, so a changed close on the reference bar means the stored history
+        is stale and has to be downloaded again.
+        """
+        reference = self._reference_bar(cached)
+        overlap = delta[delta["date"] == reference["date"]]
+        if overlap.empty:
+            return False
+        return self._fqt == "0" or overlap["close"].iloc[0] == reference["close"]
+
+    @abstractmethod
+    def _hist_request(self, start_date: str, end_date: str) -> Tuple[str, dict]:
+        """Return the url and query params of the kline request for the given date range."""
 
     @abstractmethod
-    def get_hist_data(self) -> pd.DataFrame:
+    def _parse_hist_data(self, data_json: dict, start_date: str, end_date: str) -> pd.DataFrame:
         pass
 
+    def get_hist_data(self, start_date: str, end_date: str) -> pd.DataFrame:
+        url, params = self._hist_request(start_date, end_date)
+        self._fqt = params.get("fqt", "0")
+        r = session.get(url, params=params, timeout=self.timeout)
+        return self._parse_hist_data(r.json(), start_date, end_date)
+
+    async def aget_hist_data(self, start_date: str, end_date: str) -> pd.DataFrame:
+        url, params = await asyncio.to_thread(self._hist_request, start_date, end_date)
+        self._fqt = params.get("fqt", "0")
+        data_json = await async_client.get_json(url, params, timeout=self.timeout)
+        return self._parse_hist_data(data_json, start_date, end_date)
+
+    def _plan_fetch(self) -> Tuple[pd.DataFrame, str, Optional[Tuple[str, str]]]:
+        """Return the stored bars, the start date they cover and the date range still to download."""
+        if self.store is None:
+            return pd.DataFrame(), self.start_date, (self.start_date, self.end_date)
+
+        cached, stored_start = self.store.load(self.symbol, self.period, self.adjust)
+        if cached.empty or stored_start > self.start_date:
+            return pd.DataFrame(), self.start_date, (self.start_date, self.end_date)
+
+        # A store that reaches end_date is complete once that day's bar has closed, i.e. end_date is in the past.
+        last_date = self._compact_date(cached["date"].iloc[-1])
+        if last_date >= self.end_date and self.end_date < datetime.date.today().strftime("%Y%m%d"):
+            return cached, stored_start, None
+        return cached, stored_start, (self._compact_date(self._reference_bar(cached)["date"]), self.end_date)
+
+    def _merge_fetched(self, cached: pd.DataFrame, delta: pd.DataFrame) -> Optional[pd.DataFrame]:
+        """Append downloaded bars to the stored ones, or return None when the store has to be refetched."""
+        if cached.empty:
+            return delta
+        if delta.empty or self._is_consistent(cached, delta):
+            df = self.store.merge(cached, delta)
+            logger.info(f"Appending {len(df) - len(cached)} new bars to store: {self.symbol} {self.period}")
+            return df
+        logger.info(f"Stored bars are stale, downloading full history: {self.symbol} {self.period}")
+        return None
+
+    def _save_and_slice(self, df: pd.DataFrame, stored_start: str) -> pd.DataFrame:
+        if self.store is not None and not df.empty:
+            self.store.save(self.symbol, self.period, self.adjust, df, stored_start)
+        return self._slice_dates(df, self.start_date, self.end_date)
+
+    def _resamples_locally(self) -> bool:
+        return self.store is not None and self.period in PERIOD_FREQS
+
+    def _shares_daily(self) -> bool:
+        return self.store is not None and (self.period == "daily" or self.period in PERIOD_FREQS)
+
+    def _share_key(self) -> tuple:
+        """Identify fetchers whose bars can all be derived from one daily download."""
+        return type(self), self.symbol, self.adjust, self.end_date, self.store.root
+
+    def _daily_fetcher(self) -> "DataFetcher":
+        """Return a daily-period twin that covers every week/month touched by the requested range."""
+        daily = copy.copy(self)
+        daily.period = "daily"
+        daily.start_date = period_start(self.start_date, self.period)
+        return daily
+
+    def _from_daily(self, daily: pd.DataFrame) -> pd.DataFrame:
+        df = daily if self.period == "daily" else resample_bars(daily, self.period)
+        return self._slice_dates(df, self.start_date, self.end_date)
+
+    def load_hist_data(self) -> pd.DataFrame:
+        if self._resamples_locally():
+            return self._from_daily(self._daily_fetcher().load_hist_data())
+
+        cached, stored_start, date_range = self._plan_fetch()
+        if date_range is None:
+            return self._slice_dates(cached, self.start_date, self.end_date)
+
+        df = self._merge_fetched(cached, self.get_hist_data(*date_range))
+        if df is None:
+            df = self.get_hist_data(stored_start, self.end_date)
+        return self._save_and_slice(df, stored_start)
+
+    async def aload_hist_data(self) -> pd.DataFrame:
+        if self._resamples_locally():
+            return self._from_daily(await self._daily_fetcher().aload_hist_data())
+
+        cached, stored_start, date_range = await asyncio.to_thread(self._plan_fetch)
+        if date_range is None:
+            return self._slice_dates(cached, self.start_date, self.end_date)
+
+        df = self._merge_fetched(cached, await self.aget_hist_data(*date_range))
+        if df is None:
+            df = await self.aget_hist_data(stored_start, self.end_date)
+        return await asyncio.to_thread(self._save_and_slice, df, stored_start)
+
     def get_data(self) -> pd.DataFrame:
-        df = self.get_hist_data()
+        df = self.load_hist_data()
+        df = self.calc_indicators(df)
+        return df
+
+    async def aget_data(self) -> pd.DataFrame:
+        df = await self.aload_hist_data()
         df = self.calc_indicators(df)
         return df
+
+    @staticmethod
+    async def agather_data(
+        fetchers: List["DataFetcher"], as_panel: bool = False
+    ) -> Tuple[Union[pd.DataFrame, Dict[Tuple[str, str], pd.DataFrame]], Dict[Tuple[str, str], Exception]]:
+        """Download several histories concurrently and compute their indicators in one panel pass.
+
+        Returns the frames keyed by ``(symbol, period)`` (or concatenated into a panel with a
+        ``(symbol, period, index)`` MultiIndex) together with the errors of the fetchers that failed. Daily,
+        weekly and monthly fetchers of one symbol share a single daily download covering all their ranges.
+        """
+        daily = {}
+        for fetcher in fetchers:
+            if fetcher._shares_daily():
+                twin = fetcher._daily_fetcher()
+                key = fetcher._share_key()
+                if key not in daily or twin.start_date < daily[key].start_date:
+                    daily[key] = twin
+        daily_loads = {key: asyncio.ensure_future(twin.aload_hist_data()) for key, twin in daily.items()}
+
+        async def load(fetcher: DataFetcher) -> pd.DataFrame:
+            if not fetcher._shares_daily():
+                return await fetcher.aload_hist_data()
+            return fetcher._from_daily(await daily_loads[fetcher._share_key()])
+
+        results = await asyncio.gather(*[load(fetcher) for fetcher in fetchers], return_exceptions=True)
+
+        hists, errors = {}, {}
+        for fetcher, result in zip(fetchers, results):
+            key = (fetcher.symbol, fetcher.period)
+            if isinstance(result, Exception):
+                logger.error(f"Error fetching {fetcher.symbol} {fetcher.period}: {result}")
+                errors[key] = result
+            elif result.empty:
+                logger.error(f"No data fetched for {fetcher.symbol} {fetcher.period}")
+                errors[key] = ValueError(f"No data fetched for {fetcher.symbol} {fetcher.period}")
+            else:
+                hists[key] = result
+
+        frames = dict(zip(hists.keys(), IndicatorEngine().compute_panel(list(hists.values()))))
+        if as_panel:
+            if not frames:
+                return pd.DataFrame(), errors
+            return pd.concat(frames, names=["symbol", "period", "index"]), errors
+        return frames, errors
+
+    @classmethod
+    async def afetch_many(
+        cls,
+        items: List[Tuple[str, str, str, str]],
+        start_date: str,
+        end_date: str,
+        as_panel: bool = False,
+        **kwargs,
+    ) -> Tuple[Union[pd.DataFrame, Dict[Tuple[str, str], pd.DataFrame]], Dict[Tuple[str, str], Exception]]:
+        """Fetch ``(name, symbol, period, adjust)`` items with this fetcher class, see ``agather_data``."""
+        fetchers = [
+            cls(name, symbol, start_date, end_date, period=period, adjust=adjust, **kwargs)
+            for name, symbol, period, adjust in items
+        ]
+        return await cls.agather_data(fetchers, as_panel)
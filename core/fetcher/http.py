@@ -0,0 +1,43 @@
+import asyncio
+from typing import Optional
+
+import aiohttp
+import requests
+
+session = requests.Session()
+
+
+class AsyncHttpClient:
+    """Shared aiohttp session with keep-alive, a bounded connection pool and a cap on in-flight requests."""
+
+    def __init__(self, max_connections: int = 32, max_concurrency: int = 32, keepalive_timeout: float = 30):
+        self.max_connections = max_connections
+        self.max_concurrency = max_concurrency
+        self.keepalive_timeout = keepalive_timeout
+
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._loop is not loop:
+            connector = aiohttp.TCPConnector(limit=self.max_connections, keepalive_timeout=self.keepalive_timeout)
+            self._session = aiohttp.ClientSession(connector=connector)
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._loop = loop
+        return self._session
+
+    async def get_json(self, url: str, params: dict, timeout: Optional[float] = None):
+        session = self._get_session()
+        async with self._semaphore:
+            async with session.get(url, params=params, timeout=aiohttp.ClientTimeout(total=timeout)) as r:
+                return await r.json(content_type=None)
+
+    async def close(self):
+        if self._session is not None and not self._session.closed and self._loop is asyncio.get_running_loop():
+            await self._session.close()
+        self._session = None
+
+
+async_client = AsyncHttpClient()
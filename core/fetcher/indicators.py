@@ -0,0 +1,214 @@
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+INDICATOR_COLUMNS = [
+    "date",
+    "open",
+    "high",
+    "low",
+    "close",
+    "volume",
+    "MA5",
+    "MA20",
+    "MA60",
+    "MA120",
+    "Boll_Upper",
+    "Boll_Mid",
+    "Boll_Lower",
+    "DIF",
+    "DEA",
+    "MACD",
+    "RSI14",
+]
+
+MA_WINDOWS = (5, 20, 60, 120)
+BOLL_WINDOW = 20
+RSI_WINDOW = 14
+EMA_BLOCK = 32
+
+
+def rolling_mean(x: np.ndarray, window: int) -> np.ndarray:
+    """Trailing mean over the last axis, NaN until a full window is available (pandas ``rolling().mean()``)."""
+    out = np.full(x.shape, np.nan)
+    if x.shape[-1] >= window:
+        out[..., window - 1 :] = sliding_window_view(x, window, axis=-1).mean(axis=-1)
+    return out
+
+
+def rolling_std(x: np.ndarray, window: int) -> np.ndarray:
+    """Trailing sample standard deviation over the last axis (pandas ``rolling().std()``)."""
+    out = np.full(x.shape, np.nan)
+    if x.shape[-1] >= window:
+        out[..., window - 1 :] = sliding_window_view(x, window, axis=-1).std(axis=-1, ddof=1)
+    return out
+
+
+def ema(
+    x: np.ndarray, span: int, prev: Optional[np.ndarray] = None, gap: Optional[np.ndarray] = None
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Recursive EMA over the last axis (pandas ``ewm(span, adjust=False)``), continuing from ``prev`` if given.
+
+    The recursion is solved in closed form inside blocks of ``EMA_BLOCK`` bars, which keeps the decay factors
+    small enough for float64 while only looping once per block. Blocks with NaN are stepped through the way
+    pandas does it: the average is held over the gap and the bar after it weighs the previous average by the
+    decay for the whole gap. Returns the EMA plus the last average and the open gap length to continue from.
+    """
+    alpha = 2.0 / (span + 1.0)
+    decay = 1.0 - alpha
+    out = np.empty(x.shape)
+    if gap is None:
+        gap = np.zeros(x.shape[:-1])
+    if x.shape[-1] == 0:
+        return out, prev, gap
+
+    start = 0
+    if prev is None:
+        prev = x[..., 0]
+        out[..., 0] = prev
+        start = 1
+
+    powers = decay ** np.arange(1, EMA_BLOCK + 1)
+    for i in range(start, x.shape[-1], EMA_BLOCK):
+        block = x[..., i : i + EMA_BLOCK]
+        n = block.shape[-1]
+        if np.isnan(block).any() or np.isnan(prev).any() or gap.any():
+            out[..., i : i + n], prev, gap = _ema_steps(block, prev, gap, alpha, decay)
+            continue
+        weights = powers[:n]
+        acc = np.cumsum(block / weights, axis=-1)
+        out[..., i : i + n] = weights * (np.expand_dims(prev, -1) + alpha * acc)
+        prev = out[..., i + n - 1]
+    return out, prev, gap
+
+
+def _ema_steps(
+    block: np.ndarray, prev: np.ndarray, gap: np.ndarray, alpha: float, decay: float
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    out = np.empty(block.shape)
+    for j in range(block.shape[-1]):
+        x = block[..., j]
+        observed = ~np.isnan(x)
+        old = decay ** (gap + 1)
+        with np.errstate(invalid="ignore"):
+            blended = (old * prev + alpha * x) / (old + alpha)
+        started = ~np.isnan(prev)
+        prev = np.where(observed, np.where(started, blended, x), prev)
+        gap = np.where(observed | ~started, 0, gap + 1)
+        out[..., j] = prev
+    return out, prev, gap
+
+
+def _with_indicators(df: pd.DataFrame, result: Dict[str, np.ndarray]) -> pd.DataFrame:
+    df = df.copy()
+    df["index"] = pd.to_datetime(df["date"])
+    df.set_index("index", inplace=True)
+    for key, values in result.items():
+        df[key] = values
+    return df[INDICATOR_COLUMNS]
+
+
+class IndicatorEngine:
+    """Vectorized technical indicators that carry rolling and EMA state between calls.
+
+    ``update`` only touches the new bars plus a fixed-size tail of the previous ones, so appending N bars
+    costs O(N) regardless of how long the history already is.
+    """
+
+    close_tail_size = max(max(MA_WINDOWS), BOLL_WINDOW) - 1
+    change_tail_size = RSI_WINDOW - 1
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self._close_tail: Optional[np.ndarray] = None
+        self._gain_tail: Optional[np.ndarray] = None
+        self._loss_tail: Optional[np.ndarray] = None
+        self._ema12: Optional[np.ndarray] = None
+        self._ema26: Optional[np.ndarray] = None
+        self._dea: Optional[np.ndarray] = None
+        self._ema12_gap: Optional[np.ndarray] = None
+        self._ema26_gap: Optional[np.ndarray] = None
+        self._dea_gap: Optional[np.ndarray] = None
+
+    def update(self, close: np.ndarray) -> Dict[str, np.ndarray]:
+        """Compute indicators for new closes shaped ``(..., n)``, continuing from the previous call."""
+        close = np.asarray(close, dtype=np.float64)
+        n = close.shape[-1]
+
+        if self._close_tail is None:
+            closes = close
+            change = np.diff(close, axis=-1, prepend=np.nan)
+        else:
+            closes = np.concatenate([self._close_tail, close], axis=-1)
+            change = np.diff(closes[..., -(n + 1) :], axis=-1)
+
+        result = {}
+        for window in MA_WINDOWS:
+            result[f"MA{window}"] = rolling_mean(closes, window)[..., -n:]
+
+        boll_mid = rolling_mean(closes, BOLL_WINDOW)[..., -n:]
+        boll_std = rolling_std(closes, BOLL_WINDOW)[..., -n:]
+        result["Boll_Upper"] = boll_mid + 2 * boll_std
+        result["Boll_Mid"] = boll_mid
+        result["Boll_Lower"] = boll_mid - 2 * boll_std
+
+        ema12, ema12_last, ema12_gap = ema(close, 12, self._ema12, self._ema12_gap)
+        ema26, ema26_last, ema26_gap = ema(close, 26, self._ema26, self._ema26_gap)
+        dif = ema12 - ema26
+        dea, dea_last, dea_gap = ema(dif, 9, self._dea, self._dea_gap)
+        result["DIF"] = dif
+        result["DEA"] = dea
+        result["MACD"] = (dif - dea) * 2
+
+        gain = np.where(change > 0, change, 0.0)
+        loss = np.where(change < 0, -change, 0.0)
+        if self._gain_tail is not None:
+            gain = np.concatenate([self._gain_tail, gain], axis=-1)
+            loss = np.concatenate([self._loss_tail, loss], axis=-1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rs = rolling_mean(gain, RSI_WINDOW) / rolling_mean(loss, RSI_WINDOW)
+            result["RSI14"] = (100 - (100 / (1 + rs)))[..., -n:]
+
+        if n:
+            self._close_tail = closes[..., -self.close_tail_size :]
+            self._gain_tail = gain[..., -self.change_tail_size :]
+            self._loss_tail = loss[..., -self.change_tail_size :]
+            self._ema12, self._ema12_gap = ema12_last, ema12_gap
+            self._ema26, self._ema26_gap = ema26_last, ema26_gap
+            self._dea, self._dea_gap = dea_last, dea_gap
+        return result
+
+    def append(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Return ``df`` with the indicator columns, treating it as the bars that follow the previous call."""
+        result = self.update(df["close"].to_numpy(dtype=np.float64))
+        return _with_indicators(df, result)
+
+    def compute(self, df: pd.DataFrame) -> pd.DataFrame:
+        self.reset()
+        return self.append(df)
+
+    def compute_panel(self, frames: List[pd.DataFrame]) -> List[pd.DataFrame]:
+        """Compute indicators for several independent histories in one pass.
+
+        Closes are laid out as a ``(symbols, bars)`` matrix padded with NaN at the end, so every indicator is
+        evaluated once across the whole panel and each padded tail is dropped when the frames are split back.
+        """
+        self.reset()
+        if not frames:
+            return []
+
+        lengths = [len(df) for df in frames]
+        close = np.full((len(frames), max(lengths)), np.nan)
+        for i, df in enumerate(frames):
+            close[i, : lengths[i]] = df["close"].to_numpy(dtype=np.float64)
+        result = self.update(close)
+        self.reset()
+
+        return [
+            _with_indicators(df, {key: values[i, : lengths[i]] for key, values in result.items()})
+            for i, df in enumerate(frames)
+        ]
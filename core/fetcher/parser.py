@@ -0,0 +1,33 @@
+import io
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+INT_COLUMNS = ("volume", "open_interest")
+
+
+def parse_klines(klines: List[str], columns: List[Optional[str]]) -> pd.DataFrame:
+    """Parse push2his ``klines`` strings into typed columns in a single C-parser pass.
+
+    ``columns`` names every comma-separated field, ``None`` marks fields that are skipped. ``date`` stays a
+    string, volume-like columns are int64 and everything else float64.
+    """
+    usecols = [i for i, column in enumerate(columns) if column is not None]
+    names = [columns[i] for i in usecols]
+    if not klines:
+        return pd.DataFrame(columns=names)
+
+    dtype = {i: str if columns[i] == "date" else np.int64 if columns[i] in INT_COLUMNS else np.float64 for i in usecols}
+    buffer = io.StringIO("\n".join(klines))
+    try:
+        df = pd.read_csv(buffer, header=None, usecols=usecols, dtype=dtype)
+    except ValueError:
+        # Malformed fields ("-" for a suspended bar, ...) fall back to per-column coercion to NaN.
+        buffer.seek(0)
+        df = pd.read_csv(buffer, header=None, usecols=usecols, dtype=str, keep_default_na=False)
+        for i in usecols:
+            if columns[i] != "date":
+                df[i] = pd.to_numeric(df[i], errors="coerce")
+    df.columns = names
+    return df
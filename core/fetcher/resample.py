@@ -0,0 +1,53 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+
+PERIOD_FREQS = {"weekly": "W", "monthly": "M"}
+
+
+def period_start(date: str, period: str) -> str:
+    """Return the first calendar day (YYYYMMDD) of the week/month containing ``date``."""
+    day = datetime.datetime.strptime(date, "%Y%m%d")
+    if period == "weekly":
+        day -= datetime.timedelta(days=day.weekday())
+    elif period == "monthly":
+        day = day.replace(day=1)
+    return day.strftime("%Y%m%d")
+
+
+def resample_bars(df: pd.DataFrame, period: str) -> pd.DataFrame:
+    """Aggregate daily bars into weekly/monthly bars the way push2his labels them.
+
+    Bars are grouped by calendar week/month over the trading days actually present, so holidays and
+    exchange closures need no calendar of their own; each bar is labelled with its last trading day.
+    """
+    if df.empty:
+        return df
+
+    keys = pd.to_datetime(df["date"]).dt.to_period(PERIOD_FREQS[period]).to_numpy()
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    ends = np.r_[starts[1:], len(df)] - 1
+
+    close = df["close"].to_numpy()
+    result = {
+        "date": df["date"].to_numpy()[ends],
+        "open": df["open"].to_numpy()[starts],
+        "close": close[ends],
+        "high": np.maximum.reduceat(df["high"].to_numpy(), starts),
+        "low": np.minimum.reduceat(df["low"].to_numpy(), starts),
+    }
+    for column in ("volume", "amount", "turnover_rate"):
+        if column in df:
+            result[column] = np.add.reduceat(df[column].to_numpy(), starts)
+    if "open_interest" in df:
+        result["open_interest"] = df["open_interest"].to_numpy()[ends]
+
+    if "rise_fall_amount" in df:
+        prev_close = (df["close"] - df["rise_fall_amount"]).to_numpy()[starts]
+        result["rise_fall_amount"] = np.round(result["close"] - prev_close, 2)
+        result["rise_fall"] = np.round((result["close"] / prev_close - 1) * 100, 2)
+        if "amplitude" in df:
+            result["amplitude"] = np.round((result["high"] - result["low"]) / prev_close * 100, 2)
+
+    return pd.DataFrame(result)[[column for column in df.columns if column in result]]
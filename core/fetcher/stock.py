@@ -1,12 +1,14 @@
+from typing import Tuple
+
 import pandas as pd
-import requests
 
 from .base import DataFetcher
+from .parser import parse_klines
 
 
 class StockDataFetcher(DataFetcher):
 
-    def get_hist_data(self) -> pd.DataFrame:
+    def _hist_request(self, start_date: str, end_date: str) -> Tuple[str, dict]:
         market_code = 1 if self.symbol.startswith("6") else 0
         adjust_dict = {"qfq": "1", "hfq": "2", "": "0"}
         period_dict = {"daily": "101", "weekly": "102", "monthly": "103", "hourly": "60"}
@@ -18,27 +20,27 @@ class StockDataFetcher(DataFetcher):
             "klt": period_dict[self.period],
             "fqt": adjust_dict[self.adjust],
             "secid": f"{market_code}.{self.symbol}",
-            "beg": self.start_date,
-            "end": self.end_date,
+            "beg": start_date,
+            "end": end_date,
         }
-        r = requests.get(url, params=params, timeout=self.timeout)
-        data_json = r.json()
+        return url, params
+
+    def _parse_hist_data(self, data_json: dict, start_date: str, end_date: str) -> pd.DataFrame:
         if not (data_json["data"] and data_json["data"]["klines"]):
             return pd.DataFrame()
-        temp_df = pd.DataFrame([item.split(",") for item in data_json["data"]["klines"]])
-        temp_df.columns = [
-            "date",
-            "open",
-            "close",
-            "high",
-            "low",
-            "volume",
-            "amount",
-            "amplitude",
-            "rise_fall",
-            "rise_fall_amount",
-            "turnover_rate",
-        ]
-        for col in temp_df.columns[1:]:
-            temp_df[col] = pd.to_numeric(temp_df[col], errors="coerce")
-        return temp_df
+        return parse_klines(
+            data_json["data"]["klines"],
+            [
+                "date",
+                "open",
+                "close",
+                "high",
+                "low",
+                "volume",
+                "amount",
+                "amplitude",
+                "rise_fall",
+                "rise_fall_amount",
+                "turnover_rate",
+            ],
+        )
@@ -0,0 +1,45 @@
+import json
+import os
+from typing import Optional, Tuple
+
+import pandas as pd
+
+
+class BarStore:
+    """Parquet-backed OHLCV store, one file per (symbol, period, adjust)."""
+
+    def __init__(self, root: str = "cache/bars"):
+        self.root = root
+
+    def _base_path(self, symbol: str, period: str, adjust: str) -> str:
+        return os.path.join(self.root, period, adjust or "none", symbol)
+
+    def load(self, symbol: str, period: str, adjust: str) -> Tuple[pd.DataFrame, Optional[str]]:
+        """Return the stored bars and the earliest date (YYYYMMDD) the store has been filled from."""
+        base_path = self._base_path(symbol, period, adjust)
+        if not (os.path.exists(base_path + ".parquet") and os.path.exists(base_path + ".json")):
+            return pd.DataFrame(), None
+
+        with open(base_path + ".json", "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        return pd.read_parquet(base_path + ".parquet"), meta["start_date"]
+
+    def save(self, symbol: str, period: str, adjust: str, df: pd.DataFrame, start_date: str):
+        base_path = self._base_path(symbol, period, adjust)
+        os.makedirs(os.path.dirname(base_path), exist_ok=True)
+
+        df.reset_index(drop=True).to_parquet(base_path + ".parquet.tmp", index=False)
+        os.replace(base_path + ".parquet.tmp", base_path + ".parquet")
+        with open(base_path + ".json.tmp", "w", encoding="utf-8") as f:
+            json.dump({"start_date": start_date}, f)
+        os.replace(base_path + ".json.tmp", base_path + ".json")
+
+    @staticmethod
+    def merge(cached: pd.DataFrame, delta: pd.DataFrame) -> pd.DataFrame:
+        """Append `delta` to `cached`, letting refetched bars replace the stored ones."""
+        if cached.empty:
+            return delta
+        if delta.empty:
+            return cached
+        df = pd.concat([cached[cached["date"] < delta["date"].iloc[0]], delta], ignore_index=True)
+        return df.drop_duplicates(subset="date", keep="last").reset_index(drop=True)
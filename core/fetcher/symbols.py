@@ -0,0 +1,94 @@
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from utils.log import logger
+
+SYMBOL_URL = "https://futsse-static.eastmoney.com/redis"
+
+
+class FuturesSymbolResolver:
+    """Resolve futures names/codes to push2his ``secid`` using a crawled, disk-persisted exchange symbol map."""
+
+    def __init__(self, cache_file: str = "cache/futures_symbols.json", ttl: float = 24 * 60 * 60, workers: int = 16):
+        self.cache_file = cache_file
+        self.ttl = ttl
+        self.workers = workers
+
+        self._maps: Optional[Dict[str, Dict[str, str]]] = None
+        self._updated_at = 0.0
+        self._lock = threading.Lock()
+
+    def _get_json(self, session: requests.Session, msgid: str) -> list:
+        r = session.get(SYMBOL_URL, params={"msgid": msgid}, timeout=15)
+        return r.json()
+
+    def _crawl(self) -> List[dict]:
+        session = requests.Session()
+        session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=self.workers))
+        with session, ThreadPoolExecutor(max_workers=self.workers) as executor:
+            markets = [str(item["mktid"]) for item in self._get_json(session, "gnweb")]
+            page_counts = executor.map(lambda mktid: len(self._get_json(session, mktid)), markets)
+            msgids = [f"{mktid}_{num}" for mktid, count in zip(markets, page_counts) for num in range(1, count + 1)]
+            pages = executor.map(lambda msgid: self._get_json(session, msgid), msgids)
+            return [item for page in pages for item in page]
+
+    def _build_maps(self, all_exchange_symbol_list: List[dict]) -> Dict[str, Dict[str, str]]:
+        maps = {"c_contract_mkt": {}, "c_contract_to_e_contract": {}, "e_symbol_mkt": {}, "c_symbol_mkt": {}}
+        for item in all_exchange_symbol_list:
+            maps["c_contract_mkt"][item["name"]] = str(item["mktid"])
+            maps["c_contract_to_e_contract"][item["name"]] = item["code"]
+            maps["e_symbol_mkt"][item["vcode"]] = str(item["mktid"])
+            maps["c_symbol_mkt"][item["vname"]] = str(item["mktid"])
+        return maps
+
+    def _load_from_disk(self) -> bool:
+        if not os.path.exists(self.cache_file):
+            return False
+        with open(self.cache_file, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if time.time() - data["updated_at"] > self.ttl:
+            return False
+        self._maps = data["maps"]
+        self._updated_at = data["updated_at"]
+        return True
+
+    def _save_to_disk(self):
+        os.makedirs(os.path.dirname(self.cache_file) or ".", exist_ok=True)
+        with open(self.cache_file + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({"updated_at": self._updated_at, "maps": self._maps}, f, ensure_ascii=False)
+        os.replace(self.cache_file + ".tmp", self.cache_file)
+
+    def get_maps(self, refresh: bool = False) -> Dict[str, Dict[str, str]]:
+        with self._lock:
+            if not refresh and self._maps is not None and time.time() - self._updated_at <= self.ttl:
+                return self._maps
+            if not refresh and self._load_from_disk():
+                return self._maps
+
+            start = time.perf_counter()
+            self._maps = self._build_maps(self._crawl())
+            self._updated_at = time.time()
+            self._save_to_disk()
+            logger.info(f"Crawled futures symbol map in {time.perf_counter() - start:.2f}s")
+            return self._maps
+
+    def resolve(self, symbol: str) -> str:
+        maps = self.get_maps()
+        if symbol in maps["c_contract_mkt"]:
+            return f"{maps['c_contract_mkt'][symbol]}.{maps['c_contract_to_e_contract'][symbol]}"
+
+        symbol_char = re.findall(pattern="[\u4e00-\u9fa5a-zA-Z]+", string=symbol)[0]
+        if re.match(pattern="^[\u4e00-\u9fa5]+$", string=symbol_char):
+            return f"{maps['c_symbol_mkt'][symbol_char]}.{symbol}"
+        return f"{maps['e_symbol_mkt'][symbol_char]}.{symbol}"
+
+
+futures_symbol_resolver = FuturesSymbolResolver()
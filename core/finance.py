@@ -1,8 +1,13 @@
+import math
 import os
 import shutil
+from typing import Optional
+
+import pandas as pd
 
 from core.fetcher.base import DataFetcher
 from core.llm import FuturesLLMClient, StockLLMClient
+from utils.chart.stream import FrameStream
 from utils.config import ChartSource, Config, TTSSource
 from utils.log import logger
 from utils.report import generate_report_frames
@@ -30,6 +35,10 @@ class FinanceVideo:
             from core.kline.windows import WindowsKlineDrawer
 
             drawer = WindowsKlineDrawer
+        elif self.config.chart.source == ChartSource.native:
+            from core.kline.native import NativeKlineDrawer
+
+            drawer = NativeKlineDrawer
         else:
             raise ValueError(f"Invalid chart source: {self.config.chart.source}")
         self.drawer = drawer(self.fetcher.name, self.config.video.width, self.config.video.height, self.config.chart)
@@ -63,7 +72,7 @@ class FinanceVideo:
             shutil.rmtree(output_dir)
         os.makedirs(output_dir)
 
-    async def generate_video(self, force: bool = False):
+    async def generate_video(self, force: bool = False, df: Optional[pd.DataFrame] = None):
         output_dir = os.path.join(self.output_dir, self.fetcher.symbol, self.fetcher.period)
         if force:
             self._clean_output_dir(output_dir)
@@ -75,25 +84,36 @@ class FinanceVideo:
             return
 
         logger.info(f"Start processing stock: {self.fetcher.symbol} {self.fetcher.period}")
-        df = self.fetcher.get_data()
-
-        logger.info(f"Drawing kline for stock: {self.fetcher.symbol} {self.fetcher.period}")
-        output_image_folder = self._create_output_dir(output_dir, "images")
-        image_files = await self.drawer.draw_kline(df, output_image_folder)
+        if df is None:
+            df = await self.fetcher.aget_data()
 
         logger.info(f"Analyzing stock: {self.fetcher.symbol} {self.fetcher.period}")
         report, contents = self.llm.get_analysis(self.fetcher.name, self.fetcher.symbol, df, output_dir)
         title = contents.pop(0)
 
-        logger.info(f"Generating report image for stock: {self.fetcher.symbol} {self.fetcher.period}")
-        report_image_folder = self._create_output_dir(output_dir, "reports")
-        report_frames = await generate_report_frames(report, image_files[0], report_image_folder)
-
+        # Audio comes before the chart so a streamed kline segment knows how long it has to last.
         logger.info(f"Generating audio for stock: {self.fetcher.symbol} {self.fetcher.period}")
         output_audio_folder = self._create_output_dir(output_dir, "audios")
         subtitles = await self.tts.text_to_speech(contents, output_audio_folder)
 
+        logger.info(f"Drawing kline for stock: {self.fetcher.symbol} {self.fetcher.period}")
+        output_image_folder = self._create_output_dir(output_dir, "images")
+        kline_duration = subtitles[-1].end_time
+        kline_video, stream = None, None
+        if self.config.chart.stream:
+            kline_video = os.path.join(output_dir, "kline.mp4")
+            stream = FrameStream(kline_video, kline_duration, self.config.video.width, self.config.video.height)
+        # No more chart frames than the kline segment can show, however long the history is.
+        frame_budget = math.ceil(kline_duration * (self.config.chart.fps or self.config.video.fps))
+        image_files = await self.drawer.draw_kline(df, output_image_folder, stream, frame_budget)
+
+        logger.info(f"Generating report image for stock: {self.fetcher.symbol} {self.fetcher.period}")
+        report_image_folder = self._create_output_dir(output_dir, "reports")
+        report_frames = await generate_report_frames(report, image_files[0], report_image_folder)
+
         logger.info(f"Creating video for stock: {self.fetcher.symbol} {self.fetcher.period}")
-        await create_video(report_frames, image_files, title, subtitles, self.config.video, output_video_file)
+        await create_video(
+            report_frames, image_files, title, subtitles, self.config.video, output_video_file, kline_video
+        )
 
         logger.info(f"Video created: {output_video_file}")
@@ -1,4 +1,5 @@
 from .bg import BgKlineDrawer
+from .native import NativeKlineDrawer
 from .windows import WindowsKlineDrawer
 
-__all__ = ["BgKlineDrawer", "WindowsKlineDrawer"]
+__all__ = ["BgKlineDrawer", "NativeKlineDrawer", "WindowsKlineDrawer"]
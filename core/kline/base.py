@@ -1,134 +1,302 @@
 import asyncio
 import os
+import time
 from abc import ABC, abstractmethod
-from contextlib import asynccontextmanager
-from typing import AsyncGenerator, List, Optional, Tuple
+from contextlib import AsyncExitStack
+from typing import Any, Dict, List, Optional, Set, Tuple
 
+import numpy as np
 import pandas as pd
 from pyecharts import options as opts
 from pyecharts.charts import Bar, Grid, Line
-from pyppeteer import launch
-from pyppeteer.browser import Browser
+from pyppeteer.page import Page
 from tqdm import tqdm
 
-from utils.chart.snapshot import make_snapshot
-from utils.config import ChartConfig
+from utils.chart.browser import browser_service
+from utils.chart.cache import FrameCache
+from utils.chart.pool import PagePool
+from utils.chart.snapshot import (
+    prepare_chart_page,
+    render_chart,
+    save_as_png,
+    snapshot_chart,
+)
+from utils.chart.stream import FrameStream
+from utils.config import ChartConfig, ChartRenderMode
 from utils.log import logger
 
+CHART_JS = "echarts.getInstanceByDom(document.querySelector('div[_echarts_instance_]'))"
+
 
 class KlineDrawer(ABC):
+    # Bump whenever a change to the drawing code alters the pixels of existing frames.
+    renderer_version = 1
+
     def __init__(self, stock_name: str, width: int, height: int, config: ChartConfig):
         self.stock_name = stock_name
         self.df = None
         self.output_image_folder = None
         self.indices_list = None
+        self.columns: Dict[str, list] = {}
+        self.data_digest = ""
+        self.frame_latencies: List[float] = []
+        self.frame_timeouts = 0
+        self._chart_pages: Set[Page] = set()
+        self.stream: Optional[FrameStream] = None
+        self.frame_budget = 0
 
         self.width = width
         self.height = height
         self.config = config
+        self.frame_cache = FrameCache(config.cache.dir, config.cache.max_size_mb)
 
     def _preprocess_data(self):
         self.df["index"] = range(len(self.df))
-        self.df["rise"] = self.df[["open", "close"]].apply(lambda x: 1 if x.iloc[0] < x.iloc[1] else -1, axis=1)
+        self.df["rise"] = np.where(self.df["open"] < self.df["close"], 1, -1)
         self.df["Boll_Lower"] = self.df["Boll_Lower"].round(2)
         self.df["Boll_Upper"] = (self.df["Boll_Upper"] - self.df["Boll_Lower"]).round(2)
         self.df["Boll_Mid"] = self.df["Boll_Mid"].round(2)
 
-        self.indices_list = self.get_indices_list(len(self.df))
+        # Converted once so that building a frame only slices these lists.
+        self.columns = {
+            "dates": self.df["date"].tolist(),
+            "kline": self.df[["open", "close", "low", "high"]].values.tolist(),
+            "volume": self.df[["index", "volume", "rise"]].values.tolist(),
+            "boll_lower": self.df["Boll_Lower"].tolist(),
+            "boll_upper": self.df["Boll_Upper"].tolist(),
+            "boll_mid": self.df["Boll_Mid"].tolist(),
+        }
+        self.data_digest = FrameCache.key(self.columns)
+
+        self.indices_list = self.select_frames(self.get_indices_list(len(self.df)))
 
     @abstractmethod
     def get_indices_list(self, n: int) -> List[List[int]]:
         pass
 
+    def select_frames(self, indices_list: List[List[int]]) -> List[List[int]]:
+        """Keep at most ``frame_budget`` evenly spaced frames, always including the first and the last one."""
+        if not self.frame_budget or len(indices_list) <= self.frame_budget:
+            return indices_list
+        positions = np.unique(np.linspace(0, len(indices_list) - 1, self.frame_budget).round().astype(int))
+        logger.info(f"Rendering {len(positions)} of {len(indices_list)} frames to fit the frame budget")
+        return [indices_list[position] for position in positions]
+
+    @abstractmethod
+    def frame_fingerprint(self, indices: List[int]) -> Any:
+        """Return the JSON-serializable data that, besides the drawer settings, determines the frame's pixels."""
+        pass
+
     @abstractmethod
     async def draw_single_kline(self, indices: List[int]) -> Tuple[Line, Bar]:
         pass
 
-    @asynccontextmanager
-    async def managed_browser(self) -> AsyncGenerator[Browser, None]:
-        browser = None
-        try:
-            browser = await launch({"headless": True}, args=["--no-sandbox"])
-            yield browser
-        finally:
-            if browser:
-                try:
-                    await browser.close()
-                except Exception as e:
-                    logger.error(f"Error while closing browser: {str(e)}")
-
-    async def draw_kline_chunk(self, chunk: List[List[int]], browser: Browser) -> List[str]:
-        image_files = []
-        for indices in tqdm(chunk, desc="Drawing K-line chunk"):
-            name_prefix = f"{indices[0]:04d}_{indices[1]:04d}_{indices[2]:04d}"
+    async def build_grid(self, indices: List[int]) -> Grid:
+        overlap_kline_line, bar = await self.draw_single_kline(indices)
+        grid_chart = Grid(
+            init_opts=opts.InitOpts(
+                animation_opts=opts.AnimationOpts(animation=False),
+                width=f"{self.width // 2}px",
+                height=f"{self.height // 2}px",
+                bg_color="#fff",
+            )
+        )
+        grid_chart.add(
+            overlap_kline_line,
+            grid_opts=opts.GridOpts(
+                pos_left="10%",
+                pos_top="8%",
+                pos_right="8%",
+                height="50%",
+            ),
+        )
+        grid_chart.add(
+            bar,
+            grid_opts=opts.GridOpts(
+                pos_left="10%",
+                pos_top="60%",
+                pos_right="8%",
+                height="16%",
+            ),
+        )
+        grid_chart.js_host = self.config.js_host
+        return grid_chart
 
-            try:
-                image_path = os.path.join(self.output_image_folder, f"kline_{name_prefix}.png")
-
-                if not os.path.exists(image_path):
-                    overlap_kline_line, bar = await self.draw_single_kline(indices)
-                    grid_chart = Grid(
-                        init_opts=opts.InitOpts(
-                            animation_opts=opts.AnimationOpts(animation=False),
-                            width=f"{self.width // 2}px",
-                            height=f"{self.height // 2}px",
-                            bg_color="#fff",
-                        )
-                    )
-                    grid_chart.add(
-                        overlap_kline_line,
-                        grid_opts=opts.GridOpts(
-                            pos_left="10%",
-                            pos_top="8%",
-                            pos_right="8%",
-                            height="50%",
-                        ),
-                    )
-                    grid_chart.add(
-                        bar,
-                        grid_opts=opts.GridOpts(
-                            pos_left="10%",
-                            pos_top="60%",
-                            pos_right="8%",
-                            height="16%",
-                        ),
-                    )
-                    grid_chart.js_host = self.config.js_host
-
-                    html_path = os.path.join(self.output_image_folder, f"render_{name_prefix}.html")
-                    await make_snapshot(browser, grid_chart.render(html_path), image_path)
-                    os.remove(html_path)
-
-                image_files.append(image_path)
+    async def frame_script(self, indices: List[int]) -> str:
+        """Return the JS that turns the chart already loaded in the page into the given frame.
+
+        Drawers whose frames only differ in a few series override this to push just that data. The script is
+        evaluated as an expression, since the options may contain JS functions.
+        """
+        grid_chart = await self.build_grid(indices)
+        return f"{CHART_JS}.setOption({grid_chart.dump_options_with_quotes()}, true)"
+
+    def _image_path(self, indices: List[int]) -> Tuple[str, str]:
+        name_prefix = f"{indices[0]:04d}_{indices[1]:04d}_{indices[2]:04d}"
+        return name_prefix, os.path.join(self.output_image_folder, f"kline_{name_prefix}.png")
+
+    def frame_key(self, indices: List[int]) -> str:
+        return FrameCache.key(
+            type(self).__name__,
+            self.renderer_version,
+            self.stock_name,
+            self.width,
+            self.height,
+            self.config.js_host,
+            self.frame_fingerprint(indices),
+        )
+
+    def _report_cache(self):
+        logger.info(f"Frame cache: {self.frame_cache.hits} hits, {self.frame_cache.misses} misses")
+        self.frame_cache.hits = self.frame_cache.misses = 0
+        self.frame_cache.evict()
+
+    def _record_frame(self, start: float, finished: bool):
+        self.frame_latencies.append(time.perf_counter() - start)
+        if not finished:
+            self.frame_timeouts += 1
 
+    def _report_latencies(self):
+        if not self.frame_latencies:
+            return
+        latencies = sorted(self.frame_latencies)
+        logger.info(
+            f"Rendered {len(latencies)} frames: "
+            f"mean {sum(latencies) / len(latencies) * 1000:.0f}ms, "
+            f"p50 {latencies[len(latencies) // 2] * 1000:.0f}ms, "
+            f"p95 {latencies[int(len(latencies) * 0.95)] * 1000:.0f}ms, "
+            f"max {latencies[-1] * 1000:.0f}ms, "
+            f"{self.frame_timeouts} waited for the full timeout"
+        )
+
+    async def _emit_frame(
+        self, position: int, indices: List[int], image_data: bytes, frame_data: Optional[bytes] = None
+    ) -> Optional[str]:
+        """Hand a frame to the stream, if any, and write its PNG unless only the stream needs it.
+
+        ``frame_data`` is what the stream receives instead of the PNG, for drawers that stream raw pixels.
+        """
+        _, image_path = self._image_path(indices)
+        if self.stream:
+            await self.stream.write(position, image_data if frame_data is None else frame_data)
+            # The first frame is still written since the report uses it as background.
+            if position != 0 and not self.config.keep_frames:
+                return None
+        save_as_png(image_data, image_path)
+        return image_path
+
+    async def _reuse_frame(self, position: int, indices: List[int], key: str) -> Tuple[bool, Optional[str]]:
+        """Serve a frame from the frame cache, returning whether it was cached and the PNG written for it."""
+        if self.stream is None:
+            _, image_path = self._image_path(indices)
+            return self.frame_cache.fetch(key, image_path), image_path
+
+        image_data = self.frame_cache.load(key)
+        if image_data is None:
+            return False, None
+        return True, await self._emit_frame(position, indices, image_data)
+
+    async def render_frame(self, indices: List[int], pool: PagePool) -> bytes:
+        start = time.perf_counter()
+        async with pool.page() as page:
+            fresh = page not in self._chart_pages
+            if fresh:
+                # Each pooled page loads ECharts once and from then on only receives chart options.
+                await prepare_chart_page(page, self.config.js_host, self.width // 2, self.height // 2)
+                self._chart_pages.add(page)
+
+            if self.config.render_mode == ChartRenderMode.incremental and not fresh:
+                await page.evaluate(await self.frame_script(indices), force_expr=True)
+            else:
+                grid_chart = await self.build_grid(indices)
+                await render_chart(page, grid_chart.dump_options_with_quotes())
+            image_data, finished = await snapshot_chart(page, timeout=self.config.snapshot_timeout)
+        self._record_frame(start, finished)
+        return image_data
+
+    async def draw_frame(self, position: int, indices: List[int], pool: PagePool) -> Optional[str]:
+        key = self.frame_key(indices)
+        cached, image_path = await self._reuse_frame(position, indices, key)
+        if cached:
+            return image_path
+
+        image_data = await self.render_frame(indices, pool)
+        self.frame_cache.store(key, image_data)
+        return await self._emit_frame(position, indices, image_data)
+
+    async def draw_kline_worker(
+        self, queue: asyncio.Queue, pool: PagePool, image_files: Dict[int, Optional[str]], progress: tqdm
+    ) -> None:
+        """Take pending frames off the shared queue until it is drained, so faster browsers render more frames."""
+        while not queue.empty():
+            position, indices = queue.get_nowait()
+            try:
+                image_files[position] = await self.draw_frame(position, indices, pool)
             except Exception as e:
                 logger.error(e)
-                raise Exception(f"Error during single K-line drawing process at index {name_prefix}: {str(e)}")
+                raise Exception(f"Error during single K-line drawing process at index {indices}: {str(e)}")
+            progress.update()
 
-        return image_files
+    async def draw_kline(
+        self,
+        df: pd.DataFrame,
+        output_image_folder: str,
+        stream: Optional[FrameStream] = None,
+        frame_budget: int = 0,
+    ) -> Optional[List[str]]:
+        """Render the frames, returning the PNG files written.
 
-    async def draw_kline(self, df: pd.DataFrame, output_image_folder: str) -> Optional[List[str]]:
+        With a ``stream`` the frames are piped into it instead and only the first frame (or all of them when
+        ``keep_frames`` is set) is written as PNG. A non-zero ``frame_budget`` caps how many frames are drawn.
+        """
         self.df = df
         self.output_image_folder = output_image_folder
+        self.stream = stream
+        self.frame_budget = frame_budget
+        self.frame_latencies = []
+        self.frame_timeouts = 0
+        self._chart_pages = set()
         self._preprocess_data()
+        if stream:
+            await stream.start(len(self.indices_list))
+
+        queue = asyncio.Queue()
+        for position, indices in enumerate(self.indices_list):
+            queue.put_nowait((position, indices))
 
-        chunks = [[] for _ in range(self.config.workers)]
-        i_worker = 0
-        for indices in self.indices_list:
-            chunks[i_worker].append(indices)
-            i_worker = (i_worker + 1) % self.config.workers
+        image_files: Dict[int, Optional[str]] = {}
+        pools = [
+            PagePool(
+                browser_service,
+                slot,
+                self.config.workers,
+                max_frames=self.config.pool.max_frames,
+                max_rss_mb=self.config.pool.max_rss_mb,
+            )
+            for slot in range(self.config.browsers or os.cpu_count())
+        ]
 
-        image_files = []
+        async with AsyncExitStack() as stack:
+            await asyncio.gather(*[stack.enter_async_context(pool) for pool in pools])
 
-        async with self.managed_browser() as browser:
-            tasks = [self.draw_kline_chunk(chunk, browser) for chunk in chunks]
-            all_image_files = await asyncio.gather(*tasks, return_exceptions=True)
+            with tqdm(total=len(self.indices_list), desc="Drawing K-line") as progress:
+                tasks = [
+                    self.draw_kline_worker(queue, pool, image_files, progress)
+                    for pool in pools
+                    for _ in range(self.config.workers)
+                ]
+                results = await asyncio.gather(*tasks, return_exceptions=True)
 
-            for result in all_image_files:
+            for result in results:
                 if isinstance(result, Exception):
                     logger.error(f"Task Error: {result}")
-                else:
-                    image_files.extend(result)
 
-        image_files.sort()
-        return image_files
+        if stream:
+            await stream.finish()
+            self.stream = None
+
+        self._report_latencies()
+        self._report_cache()
+        for i, pool in enumerate(pools):
+            logger.info(f"Page pool {i}: {pool.metrics()}")
+        return [image_files[position] for position in sorted(image_files) if image_files[position]]
@@ -1,9 +1,28 @@
-from typing import List, Tuple
+from typing import Any, List, Tuple
 
 from pyecharts import options as opts
 from pyecharts.charts import Bar, Kline, Line
 
-from core.kline.base import KlineDrawer
+from core.kline.base import CHART_JS, KlineDrawer
+
+FRAME_JS = """
+(function () {
+    const chart = %s;
+    // Kept on the chart instance, so a chart re-created by renderChart never slices stale data.
+    if (!chart.__frameData) {
+        const series = chart.getOption().series;
+        chart.__frameData = {kline: series[3].data, volume: series[5].data};
+    }
+    chart.setOption({
+        series: [
+            {}, {}, {}, {},
+            {data: chart.__frameData.kline.slice(0, %d)},
+            {},
+            {data: chart.__frameData.volume.slice(0, %d)},
+        ],
+    });
+})()
+"""
 
 
 class BgKlineDrawer(KlineDrawer):
@@ -11,26 +30,27 @@ class BgKlineDrawer(KlineDrawer):
     def get_indices_list(self, n: int) -> List[List[int]]:
         return [[0, 0, i] for i in range(0, n + 1)]
 
-    async def draw_single_kline(self, indices: List[int]) -> Tuple[Line, Bar]:
-        index = indices[-1]
+    def frame_fingerprint(self, indices: List[int]) -> Any:
+        # The faded background shows the full history, so every frame depends on all of the data.
+        return [self.data_digest, indices[-1]]
 
-        dates = self.df["date"].tolist()
-        kline_data = self.df[["open", "close", "low", "high"]]
-        volume_data = self.df[["index", "volume", "rise"]]
+    async def frame_script(self, indices: List[int]) -> str:
+        # Every frame shares the full-history background, only the highlighted bars grow.
+        index = indices[-1]
+        return FRAME_JS % (CHART_JS, index, index)
 
-        bb_lower_data = self.df["Boll_Lower"]
-        bb_upper_data = self.df["Boll_Upper"]
-        bb_middle_data = self.df["Boll_Mid"]
+    async def draw_single_kline(self, indices: List[int]) -> Tuple[Line, Bar]:
+        index = indices[-1]
 
-        current_kline = kline_data.iloc[:index]
-        current_volume = volume_data.iloc[:index]
+        columns = self.columns
+        dates = columns["dates"]
 
         bb_line = (
             Line()
             .add_xaxis(dates)
             .add_yaxis(
                 series_name="Boll Lower",
-                y_axis=bb_lower_data.tolist(),
+                y_axis=columns["boll_lower"],
                 is_smooth=True,
                 is_symbol_show=False,
                 linestyle_opts=opts.LineStyleOpts(opacity=0),
@@ -39,7 +59,7 @@ class BgKlineDrawer(KlineDrawer):
             )
             .add_yaxis(
                 series_name="Boll Upper",
-                y_axis=bb_upper_data.tolist(),
+                y_axis=columns["boll_upper"],
                 is_smooth=True,
                 is_symbol_show=False,
                 linestyle_opts=opts.LineStyleOpts(opacity=0),
@@ -49,7 +69,7 @@ class BgKlineDrawer(KlineDrawer):
             )
             .add_yaxis(
                 series_name="Boll Middle",
-                y_axis=bb_middle_data.tolist(),
+                y_axis=columns["boll_mid"],
                 is_smooth=True,
                 is_symbol_show=False,
                 linestyle_opts=opts.LineStyleOpts(opacity=0.2),
@@ -94,7 +114,7 @@ class BgKlineDrawer(KlineDrawer):
             .add_xaxis(dates)
             .add_yaxis(
                 series_name="",
-                y_axis=kline_data.values.tolist(),
+                y_axis=columns["kline"],
                 itemstyle_opts=opts.ItemStyleOpts(
                     color="rgba(239, 35, 42, 0.2)",
                     color0="rgba(20, 177, 67, 0.2)",
@@ -104,7 +124,7 @@ class BgKlineDrawer(KlineDrawer):
             )
             .add_yaxis(
                 series_name="",
-                y_axis=current_kline.values.tolist(),
+                y_axis=columns["kline"][:index],
                 itemstyle_opts=opts.ItemStyleOpts(
                     color="#ef232a",
                     color0="#14b143",
@@ -130,7 +150,7 @@ class BgKlineDrawer(KlineDrawer):
             .add_xaxis(dates)
             .add_yaxis(
                 series_name="volume",
-                y_axis=volume_data.values.tolist(),
+                y_axis=columns["volume"],
                 xaxis_index=1,
                 yaxis_index=1,
                 label_opts=opts.LabelOpts(is_show=False),
@@ -139,7 +159,7 @@ class BgKlineDrawer(KlineDrawer):
             )
             .add_yaxis(
                 series_name="volume",
-                y_axis=current_volume.values.tolist(),
+                y_axis=columns["volume"][:index],
                 xaxis_index=1,
                 yaxis_index=1,
                 label_opts=opts.LabelOpts(is_show=False),
@@ -0,0 +1,276 @@
+import asyncio
+import io
+import math
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from PIL import Image, ImageDraw, ImageFont
+
+from core.kline.bg import BgKlineDrawer
+from utils.chart.axis import get_interval_precision, nice, round_number, scale_nice_val
+from utils.chart.stream import FrameStream
+from utils.log import logger
+
+PIXEL_RATIO = 2
+
+UP_COLOR = (239, 35, 42)
+DOWN_COLOR = (20, 177, 67)
+BAND_COLOR = (204, 204, 204, 51)
+MID_COLOR = (153, 153, 153, 51)
+SPLIT_AREA_COLORS = [(250, 250, 250, 51), (210, 219, 238, 51)]
+SPLIT_LINE_COLOR = (224, 230, 241, 255)
+AXIS_COLOR = (110, 112, 121, 255)
+TITLE_COLOR = (70, 70, 70, 255)
+
+_renderer: Optional["NativeRenderer"] = None
+
+
+def _init_worker(payload: Dict):
+    global _renderer
+    _renderer = NativeRenderer(payload)
+
+
+def _render_frames(indices: List[int]) -> List[Tuple[bytes, Optional[bytes]]]:
+    return _renderer.render(indices)
+
+
+def _axis_ticks(val_max: float, val_min: float, split_number: int) -> Tuple[float, float, List[float]]:
+    val_max, val_min = scale_nice_val(val_max, val_min, split_number)
+    interval = nice((val_max - val_min) / split_number)
+    precision = get_interval_precision(interval)
+    first = math.ceil(val_min / interval) * interval
+    ticks = [round_number(first + i * interval, precision) for i in range(int((val_max - first) / interval) + 1)]
+    return val_max, val_min, ticks
+
+
+class NativeRenderer:
+    """Draws BgKlineDrawer frames with Pillow, matching the layout of the pyecharts Grid.
+
+    Everything shared by all frames (title, axes, Bollinger band, faded full-history bars) is drawn once into
+    a base image. Frames are then rendered in increasing bar order on a working copy, so each frame only adds
+    the candles and volume bars between the previous frame and itself.
+    """
+
+    def __init__(self, payload: Dict):
+        self.payload = payload
+        self.n = len(payload["close"])
+        self.width = payload["width"] // 2 * PIXEL_RATIO
+        self.height = payload["height"] // 2 * PIXEL_RATIO
+
+        self.left = self.width * 0.10
+        self.right = self.width * 0.92
+        self.kline_top = self.height * 0.08
+        self.kline_bottom = self.kline_top + self.height * 0.50
+        self.volume_top = self.height * 0.60
+        self.volume_bottom = self.volume_top + self.height * 0.16
+        self.band_width = (self.right - self.left) / max(self.n, 1)
+
+        lower, upper = payload["boll_lower"], payload["boll_upper"]
+        price_max = np.nanmax(np.concatenate([payload["high"], upper]))
+        price_min = np.nanmin(np.concatenate([payload["low"], lower]))
+        self.price_max, self.price_min, self.price_ticks = _axis_ticks(price_max, price_min, 5)
+        self.volume_max, self.volume_min, _ = _axis_ticks(payload["volume"].max(), payload["volume"].min(), 2)
+
+        self.x = self.left + (np.arange(self.n) + 0.5) * self.band_width
+        self.base = self._draw_base()
+
+    def _font(self, size: int) -> ImageFont.FreeTypeFont:
+        return ImageFont.truetype(self.payload["font"], size * PIXEL_RATIO)
+
+    def _price_y(self, values: np.ndarray) -> np.ndarray:
+        ratio = (values - self.price_min) / (self.price_max - self.price_min)
+        return self.kline_bottom - ratio * (self.kline_bottom - self.kline_top)
+
+    def _volume_y(self, values: np.ndarray) -> np.ndarray:
+        ratio = (values - self.volume_min) / max(self.volume_max - self.volume_min, 1)
+        return self.volume_bottom - ratio * (self.volume_bottom - self.volume_top)
+
+    def _draw_bars(self, draw: ImageDraw.ImageDraw, start: int, end: int, alpha: Optional[Tuple[int, int]] = None):
+        """Draw candles and volume bars ``[start, end)``, translucent (fill, border alpha) when ``alpha`` is set."""
+        payload = self.payload
+        body_half = max(self.band_width * 0.35, PIXEL_RATIO / 2)
+        volume_half = max(self.band_width * 0.25, PIXEL_RATIO / 2)
+        open_y, close_y = self._price_y(payload["open"][start:end]), self._price_y(payload["close"][start:end])
+        high_y, low_y = self._price_y(payload["high"][start:end]), self._price_y(payload["low"][start:end])
+        volume_y = self._volume_y(payload["volume"][start:end])
+
+        for i in range(end - start):
+            color = UP_COLOR if payload["rise"][start + i] > 0 else DOWN_COLOR
+            fill, border = (color + (alpha[0],), color + (alpha[1],)) if alpha else (color, color)
+            x = self.x[start + i]
+            top, bottom = min(open_y[i], close_y[i]), max(open_y[i], close_y[i])
+            draw.line([(x, high_y[i]), (x, low_y[i])], fill=border, width=PIXEL_RATIO)
+            draw.rectangle([x - body_half, top, x + body_half, max(bottom, top + 1)], fill=fill, outline=border)
+            draw.rectangle(
+                [x - volume_half, volume_y[i], x + volume_half, self.volume_bottom], fill=fill if alpha else color
+            )
+
+    def _draw_base(self) -> Image.Image:
+        payload = self.payload
+        image = Image.new("RGBA", (self.width, self.height), (255, 255, 255, 255))
+
+        overlay = Image.new("RGBA", image.size, (0, 0, 0, 0))
+        draw = ImageDraw.Draw(overlay)
+        tick_y = self._price_y(np.array(self.price_ticks))
+        edges = [self.kline_bottom] + [y for y in tick_y if self.kline_top < y < self.kline_bottom] + [self.kline_top]
+        for i in range(len(edges) - 1):
+            draw.rectangle([self.left, edges[i + 1], self.right, edges[i]], fill=SPLIT_AREA_COLORS[i % 2])
+        image.alpha_composite(overlay)
+
+        draw = ImageDraw.Draw(image)
+        label_font = self._font(12)
+        for tick, y in zip(self.price_ticks, tick_y):
+            draw.line([(self.left, y), (self.right, y)], fill=SPLIT_LINE_COLOR, width=PIXEL_RATIO)
+            draw.text((self.left - 8 * PIXEL_RATIO, y), f"{tick:g}", fill=AXIS_COLOR, font=label_font, anchor="rm")
+        draw.line([(self.left, self.kline_bottom), (self.right, self.kline_bottom)], fill=AXIS_COLOR, width=PIXEL_RATIO)
+        for i in np.linspace(0, self.n - 1, min(self.n, 5)).astype(int):
+            draw.text(
+                (self.x[i], self.kline_bottom + 8 * PIXEL_RATIO),
+                payload["dates"][i],
+                fill=AXIS_COLOR,
+                font=label_font,
+                anchor="mt",
+            )
+
+        title_top = self.height * 0.01 + 5 * PIXEL_RATIO
+        draw.text((self.width / 2, title_top), payload["title"], fill=TITLE_COLOR, font=self._font(18), anchor="mt")
+        draw.text(
+            (self.width / 2, title_top + 28 * PIXEL_RATIO),
+            f"{payload['dates'][0]}~{payload['dates'][-1]}",
+            fill=AXIS_COLOR,
+            font=label_font,
+            anchor="mt",
+        )
+
+        overlay = Image.new("RGBA", image.size, (0, 0, 0, 0))
+        draw = ImageDraw.Draw(overlay)
+        valid = ~(np.isnan(payload["boll_lower"]) | np.isnan(payload["boll_upper"]))
+        if valid.sum() > 1:
+            x = self.x[valid]
+            upper_y = self._price_y(payload["boll_upper"][valid])
+            lower_y = self._price_y(payload["boll_lower"][valid])
+            mid_y = self._price_y(payload["boll_mid"][valid])
+            draw.polygon(list(zip(x, upper_y)) + list(zip(x[::-1], lower_y[::-1])), fill=BAND_COLOR)
+            draw.line(list(zip(x, mid_y)), fill=MID_COLOR, width=PIXEL_RATIO)
+        image.alpha_composite(overlay)
+
+        overlay = Image.new("RGBA", image.size, (0, 0, 0, 0))
+        self._draw_bars(ImageDraw.Draw(overlay), 0, self.n, alpha=(51, 77))
+        image.alpha_composite(overlay)
+        return image.convert("RGB")
+
+    def render(self, indices: List[int]) -> List[Tuple[bytes, Optional[bytes]]]:
+        """Return the frames showing the first ``index`` bars, for each of ``indices``.
+
+        Each frame is its PNG bytes, which go to the frame cache, and its raw rgb24 pixels when the payload asks
+        for them to be streamed.
+        """
+        image = None
+        drawn = 0
+        images: Dict[int, Tuple[bytes, Optional[bytes]]] = {}
+        for index in sorted(set(indices)):
+            if image is None or index < drawn:
+                image, drawn = self.base.copy(), 0
+            self._draw_bars(ImageDraw.Draw(image), drawn, index)
+            drawn = index
+            buffer = io.BytesIO()
+            image.save(buffer, format="PNG", compress_level=1)
+            images[index] = buffer.getvalue(), image.tobytes() if self.payload["raw"] else None
+        return [images[index] for index in indices]
+
+
+class NativeKlineDrawer(BgKlineDrawer):
+    """Renders the bg frames with NumPy/Pillow across a process pool instead of headless Chromium."""
+
+    def frame_fingerprint(self, indices: List[int]) -> Any:
+        return super().frame_fingerprint(indices) + [self.config.native.font]
+
+    def _frame_size(self) -> Tuple[int, int]:
+        return self.width // 2 * PIXEL_RATIO, self.height // 2 * PIXEL_RATIO
+
+    async def _emit_frame(
+        self, position: int, indices: List[int], image_data: bytes, frame_data: Optional[bytes] = None
+    ) -> Optional[str]:
+        if self.stream and frame_data is None:
+            # Frames served by the cache are PNGs, the stream takes raw pixels.
+            frame_data = Image.open(io.BytesIO(image_data)).convert("RGB").tobytes()
+        return await super()._emit_frame(position, indices, image_data, frame_data)
+
+    def _payload(self) -> Dict:
+        lower = self.df["Boll_Lower"].to_numpy(dtype=np.float64)
+        return {
+            "width": self.width,
+            "height": self.height,
+            "font": self.config.native.font,
+            "raw": self.stream is not None,
+            "title": f"{self.stock_name} Boll & Kline",
+            "dates": self.df["date"].tolist(),
+            "open": self.df["open"].to_numpy(dtype=np.float64),
+            "close": self.df["close"].to_numpy(dtype=np.float64),
+            "low": self.df["low"].to_numpy(dtype=np.float64),
+            "high": self.df["high"].to_numpy(dtype=np.float64),
+            "volume": self.df["volume"].to_numpy(dtype=np.float64),
+            "rise": self.df["rise"].to_numpy(),
+            "boll_lower": lower,
+            "boll_upper": lower + self.df["Boll_Upper"].to_numpy(dtype=np.float64),
+            "boll_mid": self.df["Boll_Mid"].to_numpy(dtype=np.float64),
+        }
+
+    async def draw_kline(
+        self,
+        df: pd.DataFrame,
+        output_image_folder: str,
+        stream: Optional[FrameStream] = None,
+        frame_budget: int = 0,
+    ) -> Optional[List[str]]:
+        self.df = df
+        self.output_image_folder = output_image_folder
+        self.stream = stream
+        self.frame_budget = frame_budget
+        self._preprocess_data()
+        if stream:
+            await stream.start(len(self.indices_list), self._frame_size())
+
+        image_files: Dict[int, Optional[str]] = {}
+        frames = []
+        for position, indices in enumerate(self.indices_list):
+            key = self.frame_key(indices)
+            cached, image_files[position] = await self._reuse_frame(position, indices, key)
+            if not cached:
+                frames.append((position, key))
+
+        if frames:
+            start = time.perf_counter()
+            # Contiguous chunks keep the incremental drawing inside each worker cheap.
+            n_chunks = min(len(frames), self.config.workers * 4)
+            chunks = [frames[i * len(frames) // n_chunks : (i + 1) * len(frames) // n_chunks] for i in range(n_chunks)]
+
+            loop = asyncio.get_running_loop()
+            with ProcessPoolExecutor(
+                max_workers=self.config.workers, initializer=_init_worker, initargs=(self._payload(),)
+            ) as executor:
+                tasks = [
+                    loop.run_in_executor(
+                        executor, _render_frames, [self.indices_list[position][-1] for position, _ in chunk]
+                    )
+                    for chunk in chunks
+                ]
+                # Chunks are consumed in frame order, which is the order the stream needs them in.
+                for chunk, task in zip(chunks, tasks):
+                    for (position, key), (image_data, frame_data) in zip(chunk, await task):
+                        self.frame_cache.store(key, image_data)
+                        image_files[position] = await self._emit_frame(
+                            position, self.indices_list[position], image_data, frame_data
+                        )
+
+            elapsed = time.perf_counter() - start
+            logger.info(f"Rendered {len(frames)} frames natively in {elapsed:.2f}s")
+
+        if stream:
+            await stream.finish()
+            self.stream = None
+        self._report_cache()
+        return [image_files[position] for position in sorted(image_files) if image_files[position]]
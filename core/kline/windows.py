@@ -1,10 +1,11 @@
-from typing import List, Tuple
+from typing import Any, Dict, List, Tuple
 
+import numpy as np
 from pyecharts import options as opts
 from pyecharts.charts import Bar, Kline, Line
 
 from core.kline.base import KlineDrawer
-from utils.chart.axis import scale_nice_val
+from utils.chart.axis import scale_nice_val, sliding_max, smooth_bounds
 from utils.config import ChartConfig
 
 
@@ -12,26 +13,52 @@ class WindowsKlineDrawer(KlineDrawer):
 
     def __init__(self, stock_name: str, width: int, height: int, config: ChartConfig):
         self.volume_split_number = 2
-        self.line_max = 0
-        self.line_min = 0
-        self.volume_max = 0
-        self.volume_min = 0
+        self.axis_bounds: Dict[Tuple[int, ...], Tuple[float, float, float, float]] = {}
 
         super().__init__(stock_name, width, height, config)
 
     def _preprocess_data(self):
-        kline_max, kline_min = scale_nice_val(self.df["high"].max(), self.df["low"].min())
-        bb_max, bb_min = scale_nice_val(self.df["Boll_Upper"].max(), self.df["Boll_Lower"].min())
-        self.line_max = max(kline_max, bb_max)
-        self.line_min = min(kline_min, bb_min)
-
-        volume_split_number = 2
-        self.volume_max, self.volume_min = scale_nice_val(
-            self.df["volume"].max(), self.df["volume"].min(), volume_split_number
-        )
+        upper = np.fmax(self.df["high"].to_numpy(dtype=np.float64), self.df["Boll_Upper"].to_numpy(dtype=np.float64))
+        lower = np.fmin(self.df["low"].to_numpy(dtype=np.float64), self.df["Boll_Lower"].to_numpy(dtype=np.float64))
+        volume = self.df["volume"].to_numpy(dtype=np.float64)
 
         super()._preprocess_data()
 
+        smoothing = self.config.windows.axis_smoothing
+        line_bounds = smooth_bounds(self._window_bounds(upper, lower), smoothing)
+        volume_bounds = smooth_bounds(self._window_bounds(volume, volume), smoothing)
+        self.axis_bounds = {}
+        for indices, (line_max, line_min), (volume_max, volume_min) in zip(
+            self.indices_list, line_bounds, volume_bounds
+        ):
+            line_max, line_min = scale_nice_val(line_max, line_min)
+            volume_max, volume_min = scale_nice_val(volume_max, volume_min, self.volume_split_number)
+            self.axis_bounds[tuple(indices)] = (line_max, line_min, volume_max, volume_min)
+
+    def _window_bounds(self, upper: np.ndarray, lower: np.ndarray) -> List[Tuple[float, float]]:
+        """Return (max of ``upper``, min of ``lower``) over every frame's window in O(n) overall.
+
+        Frames show a growing prefix, fixed-length sliding windows or a shrinking suffix of the data, so
+        prefix/suffix running extremes and deque-based sliding extremes cover all of them.
+        """
+        n = len(upper)
+        length = min(self.config.windows.length, n)
+        prefix_max, prefix_min = np.maximum.accumulate(upper), np.minimum.accumulate(lower)
+        suffix_max, suffix_min = np.maximum.accumulate(upper[::-1])[::-1], np.minimum.accumulate(lower[::-1])[::-1]
+        sliding_upper, sliding_lower = sliding_max(upper, length), -sliding_max(-lower, length)
+
+        bounds = []
+        for _, start, end in self.indices_list:
+            if start == 0:
+                bounds.append((prefix_max[end - 1], prefix_min[end - 1]))
+            elif end == n:
+                bounds.append((suffix_max[start], suffix_min[start]))
+            elif end - start == length:
+                bounds.append((sliding_upper[start], sliding_lower[start]))
+            else:
+                bounds.append((upper[start:end].max(), lower[start:end].min()))
+        return bounds
+
     def get_indices_list(self, n: int) -> List[List[int]]:
         indices = []
         index = 0
@@ -50,31 +77,24 @@ class WindowsKlineDrawer(KlineDrawer):
             indices.append([index, 0, n])
         return indices
 
-    async def draw_single_kline(self, indices: List[int]) -> Tuple[Line, Bar]:
-        index_start = indices[1]
-        index_end = indices[2]
-
-        dates = self.df["date"].iloc[index_start:index_end].tolist()
-        kline_data = self.df[["open", "close", "low", "high"]]
-        volume_data = self.df[["index", "volume", "rise"]]
+    def frame_fingerprint(self, indices: List[int]) -> Any:
+        window = slice(indices[1], indices[2])
+        return [
+            self.axis_bounds[tuple(indices)],
+            {name: values[window] for name, values in self.columns.items()},
+        ]
 
-        bb_lower_data = self.df["Boll_Lower"]
-        bb_upper_data = self.df["Boll_Upper"]
-        bb_middle_data = self.df["Boll_Mid"]
-
-        current_kline = kline_data.iloc[index_start:index_end]
-        current_volume = volume_data.iloc[index_start:index_end]
-
-        current_bb_lower_data = bb_lower_data.iloc[index_start:index_end]
-        current_bb_upper_data = bb_upper_data.iloc[index_start:index_end]
-        current_bb_middle_data = bb_middle_data.iloc[index_start:index_end]
+    async def draw_single_kline(self, indices: List[int]) -> Tuple[Line, Bar]:
+        window = slice(indices[1], indices[2])
+        dates = self.columns["dates"][window]
+        line_max, line_min, volume_max, volume_min = self.axis_bounds[tuple(indices)]
 
         bb_line = (
             Line()
             .add_xaxis(dates)
             .add_yaxis(
                 series_name="Boll Lower",
-                y_axis=current_bb_lower_data.tolist(),
+                y_axis=self.columns["boll_lower"][window],
                 is_smooth=True,
                 is_symbol_show=False,
                 linestyle_opts=opts.LineStyleOpts(opacity=0),
@@ -83,7 +103,7 @@ class WindowsKlineDrawer(KlineDrawer):
             )
             .add_yaxis(
                 series_name="Boll Upper",
-                y_axis=current_bb_upper_data.tolist(),
+                y_axis=self.columns["boll_upper"][window],
                 is_smooth=True,
                 is_symbol_show=False,
                 linestyle_opts=opts.LineStyleOpts(opacity=0),
@@ -93,7 +113,7 @@ class WindowsKlineDrawer(KlineDrawer):
             )
             .add_yaxis(
                 series_name="Boll Middle",
-                y_axis=current_bb_middle_data.tolist(),
+                y_axis=self.columns["boll_mid"][window],
                 is_smooth=True,
                 is_symbol_show=False,
                 linestyle_opts=opts.LineStyleOpts(opacity=0.2),
@@ -103,8 +123,8 @@ class WindowsKlineDrawer(KlineDrawer):
                 xaxis_opts=opts.AxisOpts(is_scale=True),
                 yaxis_opts=opts.AxisOpts(
                     is_scale=True,
-                    min_=self.line_min,
-                    max_=self.line_max,
+                    min_=line_min,
+                    max_=line_max,
                     splitarea_opts=opts.SplitAreaOpts(is_show=True, areastyle_opts=opts.AreaStyleOpts(opacity=1)),
                 ),
                 title_opts=opts.TitleOpts(
@@ -130,7 +150,7 @@ class WindowsKlineDrawer(KlineDrawer):
             .add_xaxis(dates)
             .add_yaxis(
                 series_name="",
-                y_axis=current_kline.values.tolist(),
+                y_axis=self.columns["kline"][window],
                 itemstyle_opts=opts.ItemStyleOpts(
                     color="#ef232a",
                     color0="#14b143",
@@ -156,7 +176,7 @@ class WindowsKlineDrawer(KlineDrawer):
             .add_xaxis(dates)
             .add_yaxis(
                 series_name="volume",
-                y_axis=current_volume.values.tolist(),
+                y_axis=self.columns["volume"][window],
                 xaxis_index=1,
                 yaxis_index=1,
                 label_opts=opts.LabelOpts(is_show=False),
@@ -180,8 +200,8 @@ class WindowsKlineDrawer(KlineDrawer):
                     grid_index=1,
                     is_scale=True,
                     split_number=self.volume_split_number,
-                    min_=self.volume_min,
-                    max_=self.volume_max,
+                    min_=volume_min,
+                    max_=volume_max,
                     axislabel_opts=opts.LabelOpts(is_show=False),
                     axisline_opts=opts.AxisLineOpts(is_show=False),
                     axistick_opts=opts.AxisTickOpts(is_show=False),
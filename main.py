@@ -1,34 +1,53 @@
-import asyncio
-import datetime
-
-from core.fetcher import FuturesDataFetcher, StockDataFetcher
-from core.finance import FinanceVideo
-from utils.config import config
-
-
-async def main():
-    name = "比亚迪"
-    symbol = "002594"
-    start_date = (datetime.datetime.now() - datetime.timedelta(365)).strftime("%Y%m%d")
-    end_date = datetime.datetime.now().strftime("%Y%m%d")
-    fetcher_client = StockDataFetcher(
-        name=name, symbol=symbol, start_date=start_date, end_date=end_date, period="daily", adjust="qfq"
-    )
-
-    stock_client = FinanceVideo(fetcher_client, config, "stock")
-    await stock_client.generate_video(force=False)
-
-    name = "塑料主连"
-    symbol = "塑料主连"
-    start_date = (datetime.datetime.now() - datetime.timedelta(365)).strftime("%Y%m%d")
-    end_date = datetime.datetime.now().strftime("%Y%m%d")
-    fetcher_client = FuturesDataFetcher(
-        name=name, symbol=symbol, start_date=start_date, end_date=end_date, period="daily"
-    )
-
-    stock_client = FinanceVideo(fetcher_client, config, "futures")
-    await stock_client.generate_video(force=False)
-
-
-if __name__ == "__main__":
-    asyncio.run(main())
+import asyncio
+import datetime
+import os
+
+from core.fetcher import FuturesDataFetcher, StockDataFetcher
+from core.fetcher.base import DataFetcher
+from core.fetcher.http import async_client
+from core.finance import FinanceVideo
+from utils.chart.browser import REPORT_SLOT, browser_service
+from utils.config import ChartSource, config
+
+
+async def main():
+    start_date = (datetime.datetime.now() - datetime.timedelta(365)).strftime("%Y%m%d")
+    end_date = datetime.datetime.now().strftime("%Y%m%d")
+    jobs = [
+        (
+            StockDataFetcher(
+                name="比亚迪", symbol="002594", start_date=start_date, end_date=end_date, period="daily", adjust="qfq"
+            ),
+            "stock",
+        ),
+        (
+            FuturesDataFetcher(
+                name="塑料主连", symbol="塑料主连", start_date=start_date, end_date=end_date, period="daily"
+            ),
+            "futures",
+        ),
+    ]
+
+    # Browsers start up while the data is being fetched and are then shared by every video in the batch.
+    browser_slots = [REPORT_SLOT]
+    if config.chart.source != ChartSource.native:
+        browser_slots.extend(range(config.chart.browsers or os.cpu_count()))
+
+    async with browser_service:
+        (frames, _), _ = await asyncio.gather(
+            DataFetcher.agather_data([fetcher_client for fetcher_client, _ in jobs]),
+            browser_service.warm_up(browser_slots),
+        )
+
+        for fetcher_client, source in jobs:
+            df = frames.get((fetcher_client.symbol, fetcher_client.period))
+            if df is None:
+                continue
+            finance_client = FinanceVideo(fetcher_client, config, source)
+            await finance_client.generate_video(force=False, df=df)
+
+    await async_client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,11 @@
+import os
+import shutil
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# utils.config reads config.toml from the working directory on import, so the tests run from a scratch
+# directory holding a copy of the example config.
+_workdir = tempfile.mkdtemp(prefix="finvizai-tests-")
+shutil.copy(os.path.join(ROOT, "config-example.toml"), os.path.join(_workdir, "config.toml"))
+os.chdir(_workdir)
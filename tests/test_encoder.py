@@ -0,0 +1,109 @@
+import asyncio
+import subprocess
+from pathlib import Path
+from typing import Tuple
+
+import numpy as np
+import pytest
+from imageio_ffmpeg import count_frames_and_secs, get_ffmpeg_exe
+from PIL import Image
+
+from utils.config import config
+from utils.encoder import encode_span, segment_spans, span_frames, write_concat_list
+
+FPS = 24
+
+
+def make_timeline(folder, kline_video: bool = False, n_subtitles: int = 20):
+    rng = np.random.default_rng(0)
+    video_config = config.video.model_copy(update={"width": 108, "height": 192, "fps": FPS})
+
+    # Colours far apart on a coarse lattice, so compression never makes two pieces look alike.
+    durations = [1.0] + [0.4] * 5 + [0.08] * 120
+    lattice = np.stack(np.meshgrid(*[np.arange(40, 256, 40)] * 3), axis=-1).reshape(-1, 3)
+    colors = rng.permutation(lattice)[: len(durations)]
+
+    pieces, start = [], 0.0
+    for i, (duration, color) in enumerate(zip(durations, colors)):
+        image_file = str(folder / f"piece_{i:03d}.png")
+        Image.new("RGB", (108, 192), tuple(int(c) for c in color)).save(image_file)
+        pieces.append((image_file, start, start + duration))
+        start += duration
+
+    if kline_video:
+        # The chart part as a streamed kline segment, at its own frame rate, instead of one image per frame.
+        kline_list = str(folder / "kline.txt")
+        write_concat_list(kline_list, [(image_file, end - begin) for image_file, begin, end in pieces[6:]])
+        kline_file = str(folder / "kline.mp4")
+        subprocess.run(
+            [get_ffmpeg_exe(), "-loglevel", "error", "-f", "concat", "-safe", "0", "-i", kline_list]
+            + ["-vf", "fps=12.5", "-c:v", "libx264", "-qp", "0", "-pix_fmt", "yuv444p", kline_file],
+            check=True,
+        )
+        pieces = pieces[:6] + [(kline_file, 3.0, start)]
+
+    sprite_file = str(folder / "sprite.png")
+    Image.new("RGBA", (80, 20), (0, 0, 0, 200)).save(sprite_file)
+    # Subtitle starts off the frame grid, like narration lengths are.
+    starts = 3.0 + np.cumsum(rng.uniform(0.2, 0.6, n_subtitles))
+    starts = starts[starts < start]
+    ends = np.append(starts[1:], start)
+    overlays = [(sprite_file, (14, 150), s, e) for s, e in zip(starts, ends)]
+    return video_config, pieces, colors, overlays, [0, 1.0, 3.0, start, *starts], start
+
+
+def decode(video_file: str) -> np.ndarray:
+    raw = subprocess.run(
+        [get_ffmpeg_exe(), "-loglevel", "error", "-i", video_file, "-f", "rawvideo", "-pix_fmt", "rgb24", "-"],
+        capture_output=True,
+        check=True,
+    ).stdout
+    return np.frombuffer(raw, np.uint8).reshape(-1, 192, 108, 3).astype(int)
+
+
+def shown(frames: np.ndarray, colors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Return which piece every frame shows, matched by a pixel clear of the overlays, and whether the overlay
+    darkens a pixel under it."""
+    pieces = np.abs(frames[:, 60, 54, None, :] - colors[None, :, :]).sum(axis=-1).argmin(axis=1)
+    return pieces, frames[:, 160, 54].sum(axis=-1) < frames[:, 60, 54].sum(axis=-1) * 0.5
+
+
+@pytest.mark.parametrize("kline_video", [False, True], ids=["images", "kline_video"])
+def test_segments_add_up_to_single_pass(tmp_path, kline_video):
+    video_config, pieces, colors, overlays, boundaries, duration = make_timeline(tmp_path, kline_video)
+    spans = segment_spans(boundaries, FPS)
+    assert len(spans) > 10
+    assert sum(span_frames(start, end, FPS) for start, end in spans) == span_frames(0, duration, FPS)
+
+    output_folder = tmp_path / "output"
+    output_folder.mkdir()
+
+    async def encode():
+        single = str(output_folder / "single.mp4")
+        await encode_span(pieces, overlays, 0, duration, video_config, single)
+        segments = []
+        for i, (start, end) in enumerate(spans):
+            segments.append(str(output_folder / f"segment_{i:03d}.mp4"))
+            await encode_span(pieces, overlays, start, end, video_config, segments[-1])
+        return single, segments
+
+    single, segments = asyncio.run(encode())
+    # The concat lists are scratch files, only the videos are left in the output folder.
+    assert sorted(output_folder.iterdir()) == sorted(map(Path, [single, *segments]))
+    assert count_frames_and_secs(single)[0] == span_frames(0, duration, FPS)
+    for (start, end), segment in zip(spans, segments):
+        assert count_frames_and_secs(segment)[0] == span_frames(start, end, FPS), segment
+
+    # Every frame shows what is on screen at its timestamp, whether encoded in one pass or in segments.
+    times = np.arange(span_frames(0, duration, FPS)) / FPS + 1e-9
+    image_starts = 3.0 + np.arange(120) * 0.08
+    piece_starts = np.array([0.0, 1.0, 1.4, 1.8, 2.2, 2.6, *image_starts])
+    expected_pieces = np.searchsorted(piece_starts, times, side="right") - 1
+    expected_overlay = np.zeros(len(times), dtype=bool)
+    for _, _, overlay_start, overlay_end in overlays:
+        expected_overlay |= (times >= overlay_start) & (times < overlay_end)
+
+    for frames in [decode(single), np.concatenate([decode(segment) for segment in segments])]:
+        shown_pieces, shown_overlay = shown(frames, colors)
+        np.testing.assert_array_equal(shown_pieces, expected_pieces)
+        np.testing.assert_array_equal(shown_overlay, expected_overlay)
@@ -0,0 +1,67 @@
+import asyncio
+
+import pandas as pd
+import pytest
+
+import core.fetcher.base as fetcher_base
+from core.fetcher import StockDataFetcher
+from core.fetcher.base import DataFetcher
+
+
+def klines(start_date: str, end_date: str) -> dict:
+    """A push2his stock kline response with one bar per business day in the range."""
+    rows = [
+        f"{day:%Y-%m-%d},{10 + i % 7},{10.5 + i % 5},{11 + i % 7},{9.5 + i % 3},{1000 + i},{1e6 + i},1.0,0.5,0.05,0.3"
+        for i, day in enumerate(pd.bdate_range(start_date, end_date))
+    ]
+    return {"data": {"klines": rows}}
+
+
+class StubSession:
+    def __init__(self):
+        self.requests = []
+
+    def get(self, url, params, timeout=None):
+        self.requests.append((params["klt"], params["beg"], params["end"]))
+        data = klines(params["beg"], params["end"])
+        return type("Response", (), {"json": lambda _: data})()
+
+    async def get_json(self, url, params, timeout=None):
+        return self.get(url, params, timeout).json()
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    stub = StubSession()
+    monkeypatch.setattr(fetcher_base, "session", stub)
+    monkeypatch.setattr(fetcher_base, "async_client", stub)
+    return stub
+
+
+def fetchers(store_dir, start_date, periods=("daily", "weekly", "monthly")):
+    return [
+        StockDataFetcher("比亚迪", "002594", start_date, "20240628", period=period, store_dir=str(store_dir))
+        for period in periods
+    ]
+
+
+def test_closed_store_is_not_refetched(stub, tmp_path):
+    frames = [fetcher.load_hist_data() for fetcher in fetchers(tmp_path, "20240101")]
+    assert stub.requests == [("101", "20240101", "20240628")]
+
+    again = [fetcher.load_hist_data() for fetcher in fetchers(tmp_path, "20240101")]
+    assert len(stub.requests) == 1
+    for df, cached in zip(frames, again):
+        pd.testing.assert_frame_equal(df, cached)
+
+
+def test_gather_shares_one_daily_download(stub, tmp_path):
+    frames, errors = asyncio.run(DataFetcher.agather_data(fetchers(tmp_path, "20240110")))
+    assert not errors
+    # The monthly range starts earliest, so the single download covers every period.
+    assert stub.requests == [("101", "20240101", "20240628")]
+
+    daily, weekly, monthly = (frames[("002594", period)] for period in ("daily", "weekly", "monthly"))
+    assert daily["date"].iloc[0] == "2024-01-10"
+    assert weekly["date"].iloc[0] == "2024-01-12"
+    assert len(monthly) == 6 and monthly["date"].iloc[-1] == "2024-06-28"
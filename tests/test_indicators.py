@@ -0,0 +1,97 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.fetcher.indicators import INDICATOR_COLUMNS, IndicatorEngine
+
+
+def pandas_indicators(df: pd.DataFrame) -> pd.DataFrame:
+    """The pandas pipeline ``DataFetcher.calc_indicators`` used before the NumPy engine."""
+    df = df.copy()
+    df["index"] = pd.to_datetime(df["date"])
+    df.set_index("index", inplace=True)
+
+    df["MA5"] = df["close"].rolling(5).mean()
+    df["MA20"] = df["close"].rolling(20).mean()
+    df["MA60"] = df["close"].rolling(60).mean()
+    df["MA120"] = df["close"].rolling(120).mean()
+
+    df["Boll_Mid"] = df["close"].rolling(20).mean()
+    df["Boll_Std"] = df["close"].rolling(20).std()
+    df["Boll_Upper"] = df["Boll_Mid"] + 2 * df["Boll_Std"]
+    df["Boll_Lower"] = df["Boll_Mid"] - 2 * df["Boll_Std"]
+
+    df["EMA12"] = df["close"].ewm(span=12, adjust=False).mean()
+    df["EMA26"] = df["close"].ewm(span=26, adjust=False).mean()
+    df["DIF"] = df["EMA12"] - df["EMA26"]
+
+    df["DEA"] = df["DIF"].ewm(span=9, adjust=False).mean()
+    df["MACD"] = (df["DIF"] - df["DEA"]) * 2
+
+    df["change"] = df["close"].diff()
+    df["gain"] = df["change"].apply(lambda x: x if x > 0 else 0)
+    df["loss"] = df["change"].apply(lambda x: -x if x < 0 else 0)
+
+    df["avg_gain"] = df["gain"].rolling(14).mean()
+    df["avg_loss"] = df["loss"].rolling(14).mean()
+    df["RSI14"] = 100 - (100 / (1 + (df["avg_gain"] / df["avg_loss"])))
+    return df[INDICATOR_COLUMNS]
+
+
+def make_bars(n: int, seed: int = 0, nan_at=()) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, n)))
+    close[list(nan_at)] = np.nan
+    return pd.DataFrame(
+        {
+            "date": pd.date_range("2010-01-01", periods=n, freq="D").strftime("%Y-%m-%d"),
+            "open": close,
+            "high": close * 1.01,
+            "low": close * 0.99,
+            "close": close,
+            "volume": rng.integers(1000, 100000, n).astype(float),
+        }
+    )
+
+
+def assert_matches(actual: pd.DataFrame, expected: pd.DataFrame):
+    pd.testing.assert_frame_equal(actual, expected, check_exact=False, rtol=1e-9, atol=1e-9)
+
+
+NAN_CASES = {
+    "none": (),
+    "single": (1500,),
+    "gap": (700, 701, 702, 703),
+    "block_edge": (31, 32, 33, 95, 96),
+    "leading": (0, 1, 2),
+    "trailing": (2997, 2998, 2999),
+}
+
+
+@pytest.mark.parametrize("nan_at", NAN_CASES.values(), ids=NAN_CASES.keys())
+def test_full_series(nan_at):
+    df = make_bars(3000, nan_at=nan_at)
+    assert_matches(IndicatorEngine().compute(df), pandas_indicators(df))
+
+
+@pytest.mark.parametrize("nan_at", NAN_CASES.values(), ids=NAN_CASES.keys())
+@pytest.mark.parametrize("chunk", [1, 7, 250])
+def test_chunked_append(nan_at, chunk):
+    n = 400 if chunk == 1 else 3000
+    df = make_bars(n, nan_at=[i for i in nan_at if i < n])
+    engine = IndicatorEngine()
+    chunks = [engine.append(df.iloc[i : i + chunk]) for i in range(0, len(df), chunk)]
+    assert_matches(pd.concat(chunks), pandas_indicators(df))
+
+
+def test_panel_with_uneven_histories():
+    frames = [
+        make_bars(3000, seed=1),
+        make_bars(130, seed=2),
+        make_bars(10, seed=3),
+        make_bars(1200, seed=4, nan_at=(50, 51, 600)),
+    ]
+    results = IndicatorEngine().compute_panel(frames)
+    assert len(results) == len(frames)
+    for result, df in zip(results, frames):
+        assert_matches(result, pandas_indicators(df))
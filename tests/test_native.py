@@ -0,0 +1,111 @@
+import asyncio
+import io
+import os
+import subprocess
+
+import numpy as np
+import pandas as pd
+import pytest
+from imageio_ffmpeg import get_ffmpeg_exe
+from PIL import Image, ImageFont
+
+from core.kline.native import NativeKlineDrawer, NativeRenderer
+from utils.chart.stream import FrameStream
+from utils.config import ChartCacheConfig, ChartNativeConfig, config
+
+
+def resolve_font(folder: str) -> str:
+    """Return a TrueType font path: DejaVu when installed, else the FreeType font bundled with Pillow."""
+    try:
+        return ImageFont.truetype("DejaVuSans.ttf", 12).path
+    except OSError:
+        pass
+    font = ImageFont.load_default(12)
+    if not isinstance(font, ImageFont.FreeTypeFont):
+        pytest.skip("Pillow has no FreeType font to render with")
+    font_path = os.path.join(folder, "default.ttf")
+    with open(font_path, "wb") as f:
+        f.write(font.path.getvalue())
+    return font_path
+
+
+def make_bars(n: int) -> pd.DataFrame:
+    rng = np.random.default_rng(7)
+    close = 20 + np.cumsum(rng.normal(0, 0.5, n))
+    open_ = close + rng.normal(0, 0.4, n)
+    df = pd.DataFrame(
+        {
+            "date": pd.bdate_range("2024-01-02", periods=n).strftime("%Y-%m-%d"),
+            "open": open_,
+            "close": close,
+            "high": np.maximum(open_, close) + rng.uniform(0, 0.5, n),
+            "low": np.minimum(open_, close) - rng.uniform(0, 0.5, n),
+            "volume": rng.integers(1000, 5000, n).astype(float),
+        }
+    )
+    mid, std = df["close"].rolling(20).mean(), df["close"].rolling(20).std()
+    df["Boll_Mid"], df["Boll_Upper"], df["Boll_Lower"] = mid, mid + 2 * std, mid - 2 * std
+    return df
+
+
+def pixels(image_data) -> np.ndarray:
+    return np.asarray(Image.open(image_data).convert("RGB"))
+
+
+def make_drawer(folder) -> NativeKlineDrawer:
+    chart_config = config.chart.model_copy(
+        update={
+            "workers": 2,
+            "native": ChartNativeConfig(font=resolve_font(str(folder))),
+            "cache": ChartCacheConfig(dir=str(folder / "cache")),
+        }
+    )
+    return NativeKlineDrawer("测试", 320, 240, chart_config)
+
+
+def decode(video_file: str) -> np.ndarray:
+    raw = subprocess.run(
+        [get_ffmpeg_exe(), "-loglevel", "error", "-i", video_file, "-f", "rawvideo", "-pix_fmt", "rgb24", "-"],
+        capture_output=True,
+        check=True,
+    ).stdout
+    return np.frombuffer(raw, np.uint8).reshape(-1, 240, 320, 3).astype(int)
+
+
+def test_chunked_frames_match_fresh_renders(tmp_path):
+    drawer = make_drawer(tmp_path)
+    output_folder = tmp_path / "images"
+    output_folder.mkdir()
+
+    image_files = asyncio.run(drawer.draw_kline(make_bars(40), str(output_folder)))
+
+    # 41 frames over 8 chunks, each chunk drawn incrementally on its own copy of the base image.
+    assert len(image_files) == len(drawer.indices_list) == 41
+    renderer = NativeRenderer(drawer._payload())
+    for image_file, indices in zip(image_files, drawer.indices_list):
+        assert os.path.basename(image_file) == f"kline_{indices[0]:04d}_{indices[1]:04d}_{indices[2]:04d}.png"
+        fresh, _ = renderer.render([indices[-1]])[0]
+        np.testing.assert_array_equal(pixels(image_file), pixels(io.BytesIO(fresh)))
+
+
+def test_streamed_raw_frames_match_fresh_renders(tmp_path):
+    output_folder = tmp_path / "images"
+    output_folder.mkdir()
+
+    videos = []
+    # The first run streams freshly rendered pixels, the second decodes the PNGs the frame cache serves.
+    for run in range(2):
+        drawer = make_drawer(tmp_path)
+        stream = FrameStream(str(tmp_path / f"kline_{run}.mp4"), 4.1, 320, 240)
+        asyncio.run(drawer.draw_kline(make_bars(40), str(output_folder), stream))
+        videos.append(decode(stream.output_file))
+
+    fresh = np.stack(
+        [pixels(io.BytesIO(image_data)) for image_data, _ in NativeRenderer(drawer._payload()).render(range(41))]
+    ).astype(int)
+    np.testing.assert_array_equal(videos[0], videos[1])
+    assert len(videos[0]) == 41
+    # Every streamed frame is closest to the fresh render of its own index, up to the yuv444p round trip.
+    distances = np.array([np.abs(frame - fresh).mean(axis=(1, 2, 3)) for frame in videos[0]])
+    np.testing.assert_array_equal(distances.argmin(axis=1), np.arange(41))
+    assert distances.diagonal().max() < 2
@@ -0,0 +1,78 @@
+import asyncio
+import wave
+from typing import Dict, List
+
+import numpy as np
+from moviepy.config import FFMPEG_BINARY
+
+from core.schemas import SubtitleBase
+from utils.config import VideoConfig
+
+AUDIO_RATE = 44100
+
+_background_pcm: Dict[str, np.ndarray] = {}
+
+
+async def decode_audio(audio_file: str) -> np.ndarray:
+    """Decode ``audio_file`` into float32 stereo PCM at ``AUDIO_RATE``, shaped ``(samples, 2)``."""
+    process = await asyncio.create_subprocess_exec(
+        FFMPEG_BINARY,
+        "-loglevel",
+        "error",
+        "-i",
+        audio_file,
+        "-f",
+        "f32le",
+        "-ac",
+        "2",
+        "-ar",
+        str(AUDIO_RATE),
+        "-",
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    stdout, stderr = await process.communicate()
+    if process.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed to decode {audio_file}: {stderr.decode(errors='ignore')}")
+    return np.frombuffer(stdout, dtype=np.float32).reshape(-1, 2)
+
+
+async def load_background(audio_file: str) -> np.ndarray:
+    """Decode the background music once per process; every later video mixes from the same read-only array."""
+    pcm = _background_pcm.get(audio_file)
+    if pcm is None:
+        pcm = _background_pcm[audio_file] = await decode_audio(audio_file)
+    return pcm
+
+
+def write_wav(audio_file: str, pcm: np.ndarray):
+    samples = np.round(np.clip(pcm, -1, 1) * 32767).astype("<i2")
+    with wave.open(audio_file, "wb") as f:
+        f.setnchannels(pcm.shape[1])
+        f.setsampwidth(2)
+        f.setframerate(AUDIO_RATE)
+        f.writeframes(samples.tobytes())
+
+
+async def mix_audio(
+    subtitles: List[SubtitleBase], offset: float, duration: float, video_config: VideoConfig, audio_file: str
+) -> List[float]:
+    """Mix the narration at its subtitle offsets over the scaled background music into one WAV track.
+
+    Returns how long each narration clip plays, in seconds.
+    """
+    n_samples = int(round(duration * AUDIO_RATE))
+    mix = np.zeros((n_samples, 2), dtype=np.float32)
+
+    if video_config.background_audio:
+        background = (await load_background(video_config.background_audio))[:n_samples]
+        mix[: len(background)] += background * np.float32(video_config.background_audio_volume)
+
+    narrations = await asyncio.gather(*[decode_audio(subtitle.audio_file) for subtitle in subtitles])
+    for subtitle, narration in zip(subtitles, narrations):
+        start = min(int(round((subtitle.start_time + offset) * AUDIO_RATE)), n_samples)
+        narration = narration[: n_samples - start]
+        mix[start : start + len(narration)] += narration
+
+    write_wav(audio_file, mix)
+    return [len(narration) / AUDIO_RATE for narration in narrations]
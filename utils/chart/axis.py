@@ -1,4 +1,8 @@
 import math
+from collections import deque
+from typing import List, Tuple
+
+import numpy as np
 
 
 def scale_nice_val(val_max: float, val_min: float, split_number: int = 5):
@@ -42,3 +46,30 @@ def round_number(value, precision):
         return int(round(value))
     scale = 10**precision
     return round(value * scale) / scale
+
+
+def sliding_max(values: np.ndarray, window: int) -> np.ndarray:
+    """Max of every ``values[i:i + window]``, in O(n) with a monotonic deque of candidate indices."""
+    result = np.empty(len(values) - window + 1)
+    candidates = deque()
+    for i, value in enumerate(values):
+        while candidates and values[candidates[-1]] <= value:
+            candidates.pop()
+        candidates.append(i)
+        if candidates[0] <= i - window:
+            candidates.popleft()
+        if i >= window - 1:
+            result[i - window + 1] = values[candidates[0]]
+    return result
+
+
+def smooth_bounds(bounds: List[Tuple[float, float]], smoothing: float) -> List[Tuple[float, float]]:
+    """Let consecutive (max, min) bounds widen at once but only narrow by ``1 - smoothing`` of the gap per step."""
+    smoothed = []
+    for val_max, val_min in bounds:
+        if smoothed and smoothing:
+            prev_max, prev_min = smoothed[-1]
+            val_max = max(val_max, prev_max + (val_max - prev_max) * (1 - smoothing))
+            val_min = min(val_min, prev_min + (val_min - prev_min) * (1 - smoothing))
+        smoothed.append((val_max, val_min))
+    return smoothed
@@ -0,0 +1,120 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncGenerator, Dict, Hashable, Iterable, Optional
+
+from pyppeteer import launch
+from pyppeteer.browser import Browser
+
+from utils.log import logger
+
+LAUNCH_ARGS = ["--no-sandbox", "--disable-setuid-sandbox"]
+REPORT_SLOT = "report"
+
+
+class BrowserService:
+    """Process-wide headless browsers shared by the chart drawers and report generation.
+
+    Browsers live in named slots and are launched on first use, so a batch of videos pays the Chromium startup
+    once per slot instead of once per video. A borrowed browser is health-checked and relaunched if it died.
+    ``restart`` swaps a fresh browser into the slot; the old one is closed once its last borrower returns it.
+    """
+
+    def __init__(self, health_timeout: float = 5):
+        self.health_timeout = health_timeout
+        self.launches = 0
+
+        self._browsers: Dict[Hashable, Browser] = {}
+        self._borrowers: Dict[Browser, int] = {}
+        self._locks: Dict[Hashable, asyncio.Lock] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def __aenter__(self) -> "BrowserService":
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    def _lock(self, slot: Hashable) -> asyncio.Lock:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Browsers launched on a previous event loop cannot be driven from this one.
+            self._browsers, self._borrowers, self._locks = {}, {}, {}
+            self._loop = loop
+        return self._locks.setdefault(slot, asyncio.Lock())
+
+    async def _launch(self) -> Browser:
+        browser = await launch({"headless": True}, args=LAUNCH_ARGS)
+        self.launches += 1
+        return browser
+
+    async def _healthy(self, browser: Browser) -> bool:
+        if browser.process is not None and browser.process.poll() is not None:
+            return False
+        try:
+            await asyncio.wait_for(browser.version(), self.health_timeout)
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    async def _close(browser: Browser):
+        try:
+            await browser.close()
+        except Exception as e:
+            logger.error(f"Error while closing browser: {str(e)}")
+
+    async def acquire(self, slot: Hashable = 0) -> Browser:
+        async with self._lock(slot):
+            browser = self._browsers.get(slot)
+            if browser is not None and not await self._healthy(browser):
+                logger.warning(f"Browser in slot {slot} is unresponsive, relaunching it")
+                self._browsers.pop(slot)
+                if not self._borrowers.get(browser):
+                    await self._close(browser)
+                browser = None
+            if browser is None:
+                browser = self._browsers[slot] = await self._launch()
+            self._borrowers[browser] = self._borrowers.get(browser, 0) + 1
+            return browser
+
+    async def release(self, browser: Browser):
+        self._borrowers[browser] -= 1
+        if self._borrowers[browser] == 0:
+            del self._borrowers[browser]
+            if browser not in self._browsers.values():
+                await self._close(browser)
+
+    async def restart(self, slot: Hashable, browser: Browser) -> Browser:
+        """Return ``browser`` and borrow a fresh one, replacing it in ``slot`` unless another borrower already did."""
+        async with self._lock(slot):
+            if self._browsers.get(slot) is browser:
+                del self._browsers[slot]
+        await self.release(browser)
+        return await self.acquire(slot)
+
+    @asynccontextmanager
+    async def borrow(self, slot: Hashable = 0) -> AsyncGenerator[Browser, None]:
+        browser = await self.acquire(slot)
+        try:
+            yield browser
+        finally:
+            await self.release(browser)
+
+    async def warm_up(self, slots: Iterable[Hashable]):
+        """Launch the browsers for ``slots`` ahead of use and open a first page so its renderer is up."""
+
+        async def warm(slot: Hashable):
+            async with self.borrow(slot) as browser:
+                page = await browser.newPage()
+                await page.close()
+
+        await asyncio.gather(*[warm(slot) for slot in slots])
+
+    async def close(self):
+        browsers = set(self._browsers.values()) | set(self._borrowers)
+        self._browsers, self._borrowers = {}, {}
+        for browser in browsers:
+            await self._close(browser)
+
+
+browser_service = BrowserService()
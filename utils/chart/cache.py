@@ -0,0 +1,105 @@
+import hashlib
+import json
+import os
+import shutil
+from typing import Any, Optional
+
+from utils.log import logger
+
+
+class FrameCache:
+    """Content-addressed store of rendered frames, shared between runs and output folders.
+
+    Frames are keyed by a hash of everything that determines their pixels, so new bars only invalidate the
+    frames that actually show them. The directory is kept under ``max_size_mb`` by evicting the least recently
+    used frames, using the file mtime that every hit refreshes.
+    """
+
+    def __init__(self, root: str = "cache/frames", max_size_mb: float = 2048):
+        self.root = root
+        self.max_size_mb = max_size_mb
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(*parts: Any) -> str:
+        payload = json.dumps(parts, ensure_ascii=False, separators=(",", ":"), default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], f"{key}.png")
+
+    def fetch(self, key: str, image_path: str) -> bool:
+        """Place the cached frame at ``image_path``, returning False on a miss.
+
+        Whatever was at ``image_path`` is removed either way, so a frame rendered after a miss never writes
+        through a hard link into the cache.
+        """
+        if os.path.lexists(image_path):
+            os.remove(image_path)
+
+        cached_path = self.path(key)
+        try:
+            os.utime(cached_path)
+        except FileNotFoundError:
+            self.misses += 1
+            return False
+
+        try:
+            os.link(cached_path, image_path)
+        except OSError:
+            shutil.copyfile(cached_path, image_path)
+        self.hits += 1
+        return True
+
+    def load(self, key: str) -> Optional[bytes]:
+        """Return the cached frame's bytes, or None on a miss."""
+        cached_path = self.path(key)
+        try:
+            os.utime(cached_path)
+            with open(cached_path, "rb") as f:
+                image_data = f.read()
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return image_data
+
+    def store(self, key: str, image_data: bytes):
+        cached_path = self.path(key)
+        os.makedirs(os.path.dirname(cached_path), exist_ok=True)
+        tmp_path = f"{cached_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(image_data)
+        os.replace(tmp_path, cached_path)
+
+    def evict(self):
+        if not self.max_size_mb or not os.path.isdir(self.root):
+            return
+
+        entries = []
+        for dir_path, _, file_names in os.walk(self.root):
+            for file_name in file_names:
+                file_path = os.path.join(dir_path, file_name)
+                try:
+                    stat = os.stat(file_path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, file_path))
+
+        total = sum(size for _, size, _ in entries)
+        limit = self.max_size_mb * 1024 * 1024
+        if total <= limit:
+            return
+
+        removed = 0
+        for _, size, file_path in sorted(entries):
+            if total <= limit:
+                break
+            try:
+                os.remove(file_path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+        logger.info(f"Evicted {removed} frames from {self.root}, {total / 1024 / 1024:.0f}MB left")
@@ -0,0 +1,174 @@
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from typing import AsyncGenerator, Dict, Hashable, List, Optional
+
+from pyppeteer.browser import Browser
+from pyppeteer.page import Page
+
+from utils.chart.browser import BrowserService
+from utils.log import logger
+
+
+def process_tree_rss_mb(pid: int) -> float:
+    """Resident memory of ``pid`` and all its descendants in MB, 0 where /proc is unavailable."""
+    if not os.path.isdir("/proc"):
+        return 0
+
+    children: Dict[int, List[int]] = {}
+    rss_pages: Dict[int, int] = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", "r") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+        except OSError:
+            continue
+        children.setdefault(int(fields[1]), []).append(int(entry))
+        rss_pages[int(entry)] = int(fields[21])
+
+    total, stack = 0, [pid]
+    while stack:
+        current = stack.pop()
+        total += rss_pages.get(current, 0)
+        stack.extend(children.get(current, []))
+    return total * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+
+
+class PagePool:
+    """Bounded pool of reusable pages on one borrowed browser, recycling it after too many frames or too much RSS.
+
+    A recycle waits until every borrowed page has been returned, so workers never lose a page mid-frame.
+    """
+
+    rss_check_interval = 20
+
+    def __init__(
+        self,
+        browsers: BrowserService,
+        slot: Hashable,
+        size: int,
+        max_frames: int = 0,
+        max_rss_mb: float = 0,
+    ):
+        self.browsers = browsers
+        self.slot = slot
+        self.size = size
+        self.max_frames = max_frames
+        self.max_rss_mb = max_rss_mb
+
+        self.browser: Optional[Browser] = None
+        self._idle: List[Page] = []
+        self._pages = 0
+        self._in_use = 0
+        self._recycling = False
+        self._frames_since_launch = 0
+        self._condition = asyncio.Condition()
+
+        self.frames = 0
+        self.reuse_count = 0
+        self.restarts = 0
+
+    async def __aenter__(self) -> "PagePool":
+        self.browser = await self.browsers.acquire(self.slot)
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    def metrics(self) -> Dict[str, int]:
+        return {
+            "pages": self._pages,
+            "pages_in_use": self._in_use,
+            "frames": self.frames,
+            "reuse_count": self.reuse_count,
+            "restarts": self.restarts,
+        }
+
+    async def _acquire(self) -> Page:
+        async with self._condition:
+            await self._condition.wait_for(lambda: not self._recycling and (self._idle or self._pages < self.size))
+            self._in_use += 1
+            if self._idle:
+                self.reuse_count += 1
+                return self._idle.pop()
+            self._pages += 1
+
+        try:
+            page = await self.browser.newPage()
+            await page.setJavaScriptEnabled(enabled=True)
+            return page
+        except Exception:
+            async with self._condition:
+                self._pages -= 1
+                self._in_use -= 1
+                self._condition.notify_all()
+            raise
+
+    def _should_recycle(self) -> bool:
+        if self.max_frames and self._frames_since_launch >= self.max_frames:
+            return True
+        if self.max_rss_mb and self._frames_since_launch % self.rss_check_interval == 0:
+            rss = process_tree_rss_mb(self.browser.process.pid)
+            if rss >= self.max_rss_mb:
+                logger.info(f"Browser RSS {rss:.0f}MB exceeds {self.max_rss_mb}MB")
+                return True
+        return False
+
+    async def _release(self, page: Page, broken: bool):
+        async with self._condition:
+            self._in_use -= 1
+            self.frames += 1
+            self._frames_since_launch += 1
+            if broken:
+                self._pages -= 1
+            else:
+                self._idle.append(page)
+            if not self._recycling and self._should_recycle():
+                self._recycling = True
+
+            if self._recycling and self._in_use == 0:
+                await self._restart()
+            self._condition.notify_all()
+
+        if broken:
+            try:
+                await page.close()
+            except Exception as e:
+                logger.error(f"Error while closing page: {str(e)}")
+
+    async def _restart(self):
+        logger.info(f"Recycling browser after {self._frames_since_launch} frames")
+        await self._close_pages()
+        self.browser = await self.browsers.restart(self.slot, self.browser)
+        self.restarts += 1
+        self._frames_since_launch = 0
+        self._recycling = False
+
+    async def _close_pages(self):
+        idle, self._idle = self._idle, []
+        self._pages = 0
+        for page in idle:
+            try:
+                await page.close()
+            except Exception as e:
+                logger.error(f"Error while closing page: {str(e)}")
+
+    @asynccontextmanager
+    async def page(self) -> AsyncGenerator[Page, None]:
+        page = await self._acquire()
+        broken = True
+        try:
+            yield page
+            broken = False
+        finally:
+            await self._release(page, broken)
+
+    async def close(self):
+        """Close the pool's pages and hand the browser back to the service, which keeps it for the next job."""
+        async with self._condition:
+            await self._close_pages()
+            if self.browser:
+                await self.browsers.release(self.browser)
+            self.browser = None
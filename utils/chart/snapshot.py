@@ -1,31 +1,85 @@
-import asyncio
 import base64
 import os
+from typing import Tuple
 
-from pyppeteer.browser import Browser
+from pyppeteer.page import Page
 
 SNAPSHOT_JS = (
     "echarts.getInstanceByDom(document.querySelector('div[_echarts_instance_]'))."
     "getDataURL({type: '%s', pixelRatio: %s, excludeComponents: ['toolbox']})"
 )
 
+CHART_PAGE_HTML = """
+<!DOCTYPE html>
+<html>
+<head>
+<meta charset="UTF-8">
+<style>body {{ margin: 0; }}</style>
+</head>
+<body>
+<div id="chart" style="width:{width}px; height:{height}px;"></div>
+</body>
+</html>
+"""
 
-async def make_snapshot(browser: Browser, html_file: str, image_file: str, pixel_ratio: int = 2, delay: int = 2):
-    html_path = "file://" + os.path.abspath(html_file)
-    file_type = image_file.split(".")[-1]
+RENDER_CHART_JS = """
+window.renderChart = function (option) {
+    const dom = document.getElementById('chart');
+    const chart = echarts.getInstanceByDom(dom);
+    if (chart) {
+        chart.dispose();
+    }
+    echarts.init(dom, 'white', {renderer: 'canvas', locale: 'ZH'}).setOption(option);
+};
+"""
 
-    page = await browser.newPage()
-    await page.setJavaScriptEnabled(enabled=True)
-    await page.goto(html_path)
-    await asyncio.sleep(delay)
+WAIT_FINISHED_JS = """
+(timeout) => new Promise((resolve) => {
+    const chart = echarts.getInstanceByDom(document.querySelector('div[_echarts_instance_]'));
+    const timer = setTimeout(() => resolve(false), timeout);
+    chart.on('finished', function onFinished() {
+        chart.off('finished', onFinished);
+        clearTimeout(timer);
+        resolve(true);
+    });
+    // 'finished' only fires after a paint, so request one in case the chart has already settled.
+    chart.getZr().refresh();
+})
+"""
 
-    snapshot_js = SNAPSHOT_JS % (file_type, pixel_ratio)
-    content: str = await page.evaluate(snapshot_js)
 
-    content_array = content.split(",")
-    image_data = decode_base64(content_array[1])
+async def wait_finished(page: Page, timeout: float = 2) -> bool:
+    """Wait for the ECharts 'finished' event, returning False if ``timeout`` seconds pass first."""
+    return await page.evaluate(WAIT_FINISHED_JS, int(timeout * 1000))
 
-    save_as_png(image_data, image_file)
+
+def echarts_script(js_host: str) -> dict:
+    """Return the ``addScriptTag`` source of ``echarts.min.js`` under ``js_host``, a URL prefix or a directory."""
+    if js_host.startswith(("http://", "https://")):
+        return {"url": js_host.rstrip("/") + "/echarts.min.js"}
+    return {"path": os.path.join(js_host, "echarts.min.js")}
+
+
+async def prepare_chart_page(page: Page, js_host: str, width: int, height: int):
+    """Turn ``page`` into an empty chart container with ECharts loaded, without any file on disk."""
+    await page.setContent(CHART_PAGE_HTML.format(width=width, height=height))
+    await page.addScriptTag(echarts_script(js_host))
+    await page.addScriptTag({"content": RENDER_CHART_JS})
+
+
+async def render_chart(page: Page, options: str):
+    """Replace the chart on a page set up by ``prepare_chart_page`` with one built from ``options``.
+
+    ``options`` is the pyecharts dump, which may contain JS functions, so it is evaluated as an expression.
+    """
+    await page.evaluate(f"renderChart({options})", force_expr=True)
+
+
+async def snapshot_chart(page: Page, pixel_ratio: int = 2, timeout: float = 2) -> Tuple[bytes, bool]:
+    """Return the PNG bytes of the chart once it has finished rendering, and whether it did so before ``timeout``."""
+    finished = await wait_finished(page, timeout)
+    content: str = await page.evaluate(SNAPSHOT_JS % ("png", pixel_ratio))
+    return decode_base64(content.split(",")[1]), finished
 
 
 def decode_base64(data: str) -> bytes:
@@ -0,0 +1,95 @@
+import asyncio
+import os
+from fractions import Fraction
+from typing import Dict, List, Optional, Tuple
+
+from moviepy.config import FFMPEG_BINARY
+
+from utils.log import logger
+
+
+class FrameStream:
+    """Pipes encoded chart frames straight into ffmpeg, writing the kline segment without PNG files on disk.
+
+    Frames may arrive out of order from concurrent workers; they are held back until every earlier frame has
+    been written. The segment is encoded losslessly because it is decoded again when the video is composed.
+    Frames are PNG bytes, or raw rgb24 pixels when the stream is started with their ``frame_size``, which spares
+    ffmpeg decoding the PNGs of drawers that have the pixels at hand anyway.
+    """
+
+    def __init__(self, output_file: str, duration: float, width: int, height: int):
+        self.output_file = output_file
+        self.duration = duration
+        self.width = width
+        self.height = height
+
+        self.frames = 0
+        self._frame_size: Optional[Tuple[int, int]] = None
+        self._process: Optional[asyncio.subprocess.Process] = None
+        self._pending: Dict[int, bytes] = {}
+        self._next = 0
+        self._lock = asyncio.Lock()
+
+    def _command(self, n_frames: int) -> List[str]:
+        frame_rate = Fraction(n_frames / self.duration).limit_denominator(1000)
+        if self._frame_size:
+            input_args = ["-f", "rawvideo", "-pix_fmt", "rgb24", "-s", f"{self._frame_size[0]}x{self._frame_size[1]}"]
+        else:
+            input_args = ["-f", "image2pipe", "-c:v", "png"]
+        return [
+            FFMPEG_BINARY,
+            "-y",
+            "-loglevel",
+            "error",
+            *input_args,
+            "-framerate",
+            str(frame_rate),
+            "-i",
+            "-",
+            "-vf",
+            f"scale={self.width}:{self.height}",
+            "-c:v",
+            "libx264",
+            "-preset",
+            "ultrafast",
+            "-qp",
+            "0",
+            "-pix_fmt",
+            "yuv444p",
+            self.output_file,
+        ]
+
+    async def start(self, n_frames: int, frame_size: Optional[Tuple[int, int]] = None):
+        self.frames = 0
+        self._frame_size = frame_size
+        self._pending = {}
+        self._next = 0
+        self._process = await asyncio.create_subprocess_exec(
+            *self._command(n_frames), stdin=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+        )
+
+    async def write(self, position: int, image_data: bytes):
+        """Queue frame ``position`` (0-based, PNG bytes or raw pixels) and flush every frame that is now in order."""
+        self._pending[position] = image_data
+        async with self._lock:
+            while self._next in self._pending:
+                await self._feed(self._pending.pop(self._next))
+                self._next += 1
+
+    async def _feed(self, image_data: bytes):
+        self._process.stdin.write(image_data)
+        await self._process.stdin.drain()
+        self.frames += 1
+
+    async def finish(self):
+        async with self._lock:
+            if self._pending:
+                logger.warning(f"{len(self._pending)} frames arrived after a missing frame {self._next}")
+                for position in sorted(self._pending):
+                    await self._feed(self._pending.pop(position))
+
+        self._process.stdin.close()
+        _, stderr = await self._process.communicate()
+        if self._process.returncode != 0:
+            raise RuntimeError(f"ffmpeg failed for {self.output_file}: {stderr.decode(errors='ignore')}")
+        logger.info(f"Streamed {self.frames} frames into {os.path.basename(self.output_file)}")
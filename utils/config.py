@@ -13,6 +13,17 @@ class TTSSource(str, Enum):
 class ChartSource(str, Enum):
     bg = "bg"
     windows = "windows"
+    native = "native"
+
+
+class ChartRenderMode(str, Enum):
+    page = "page"
+    incremental = "incremental"
+
+
+class VideoEncoder(str, Enum):
+    moviepy = "moviepy"
+    ffmpeg = "ffmpeg"
 
 
 class LLMConfig(BaseModel):
@@ -46,13 +57,37 @@ class TTSConfig(BaseModel):
 class ChartWindowsConfig(BaseModel):
     length: int = 100
     step: int = 3
+    axis_smoothing: float = 0.8
+
+
+class ChartNativeConfig(BaseModel):
+    font: str = "./assets/fonts/msyhbd.ttc"
+
+
+class ChartPoolConfig(BaseModel):
+    max_frames: int = 500
+    max_rss_mb: int = 0
+
+
+class ChartCacheConfig(BaseModel):
+    dir: str = "cache/frames"
+    max_size_mb: int = 2048
 
 
 class ChartConfig(BaseModel):
     js_host: str
     workers: int = 4
+    browsers: int = 1
     source: ChartSource = "bg"
+    render_mode: ChartRenderMode = "page"
+    snapshot_timeout: float = 2
+    stream: bool = False
+    fps: float = 0
+    keep_frames: bool = False
     windows: ChartWindowsConfig
+    pool: ChartPoolConfig = ChartPoolConfig()
+    native: ChartNativeConfig = ChartNativeConfig()
+    cache: ChartCacheConfig = ChartCacheConfig()
 
 
 class SubtitleConfig(BaseModel):
@@ -84,6 +119,8 @@ class VideoConfig(BaseModel):
     height: int
     codec: str = "libx264"
     threads: int = 1
+    encoder: VideoEncoder = "moviepy"
+    encode_workers: int = 1
     subtitle: SubtitleConfig
     title: TitleConfig
     report: ReportConfig
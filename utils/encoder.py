@@ -0,0 +1,227 @@
+import asyncio
+import math
+import os
+import tempfile
+from typing import List, Optional, Tuple
+
+from moviepy.config import FFMPEG_BINARY
+from PIL import Image
+
+from core.schemas import SubtitleBase
+from utils.audio import mix_audio
+from utils.config import VideoConfig
+from utils.log import logger
+from utils.subtitle import create_subtitle_sprite
+
+
+async def run_ffmpeg(args: List[str]):
+    process = await asyncio.create_subprocess_exec(
+        FFMPEG_BINARY, "-y", "-loglevel", "error", *args, stderr=asyncio.subprocess.PIPE
+    )
+    _, stderr = await process.communicate()
+    if process.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed: {stderr.decode(errors='ignore')}")
+
+
+def write_concat_list(list_file: str, entries: List[Tuple[str, float]]):
+    """Write a concat-demuxer list showing each image for its duration."""
+    # The list takes the time base of its first image, 1/25 s unless the image demuxer is told otherwise,
+    # which would round the start of every image to a multiple of 40 ms.
+    framerate = "option framerate 1000000\n"
+    with open(list_file, "w", encoding="utf-8") as f:
+        for image_file, duration in entries:
+            f.write(f"file '{_escape(image_file)}'\n{framerate}duration {duration:.6f}\n")
+        # The demuxer ignores the duration of the last entry unless the file is listed once more.
+        f.write(f"file '{_escape(entries[-1][0])}'\n{framerate}")
+
+
+def _escape(path: str) -> str:
+    return os.path.abspath(path).replace("'", "'\\''")
+
+
+def span_frames(start: float, end: float, fps: int) -> int:
+    return round(end * fps) - round(start * fps)
+
+
+def segment_spans(boundaries: List[float], fps: int) -> List[Tuple[float, float]]:
+    """Snap ``boundaries`` to the frame grid, so the joined segments keep a constant frame rate, and pair them up."""
+    boundaries = sorted({round(boundary * fps) / fps for boundary in boundaries})
+    return [(start, end) for start, end in zip(boundaries[:-1], boundaries[1:]) if span_frames(start, end, fps)]
+
+
+async def encode_span(
+    pieces: List[Tuple[str, float, float]],
+    overlays: List[Tuple[str, Tuple[int, int], float, float]],
+    start: float,
+    end: float,
+    video_config: VideoConfig,
+    output_file: str,
+    audio_file: Optional[str] = None,
+):
+    """Encode the ``[start, end)`` part of the timeline into ``output_file``.
+
+    ``pieces`` are the images, or videos, shown over ``[piece_start, piece_end)`` and ``overlays`` the sprites
+    placed on top during theirs, both on the timeline's clock. Every frame shows what is on screen at its
+    timestamp and the span gets exactly ``span_frames`` frames, so spans cut on the frame grid add up to the
+    frames of the whole timeline.
+    """
+    width, height, fps = video_config.width, video_config.height, video_config.fps
+    args, filters, images = [], [], []
+    # The concat lists go to a scratch directory, so nothing but the video is left next to ``output_file``.
+    list_dir = tempfile.TemporaryDirectory()
+    list_file = os.path.join(list_dir.name, "images_{}.txt")
+
+    def first_frame(t: float) -> int:
+        # The first frame of the span whose timestamp is at or after ``t``.
+        return math.ceil((t - start) * fps - 1e-6)
+
+    def frame_time(frame: int) -> float:
+        return round(frame * 1e6 / fps) / 1e6
+
+    def add_source(source_args: List[str], sampling: str, frames: int):
+        # Padding with the last frame and trimming gives every source exactly the frames it covers.
+        index = args.count("-i")
+        args.extend(source_args)
+        filters.append(
+            f"[{index}:v]{sampling},tpad=stop=-1:stop_mode=clone,trim=end_frame={frames},"
+            f"scale={width}:{height},setsar=1,format=yuv420p[s{index}]"
+        )
+
+    def add_images():
+        if images:
+            # Each image lasts exactly its frames, so the fps filter samples it on the grid.
+            entries = [(image_file, frame_time(last) - frame_time(first)) for image_file, first, last in images]
+            write_concat_list(list_file.format(len(filters)), entries)
+            concat_args = ["-f", "concat", "-safe", "0", "-i", list_file.format(len(filters))]
+            add_source(concat_args, f"fps={fps}", images[-1][2] - images[0][1])
+            images.clear()
+
+    for source, piece_start, piece_end in pieces:
+        first, last = first_frame(max(start, piece_start)), first_frame(min(end, piece_end))
+        if last <= first:
+            continue
+        if source.endswith(".png"):
+            images.append((source, first, last))
+        else:
+            add_images()
+            # Without accurate seeking the frames before the seek point are kept with negative timestamps, so
+            # the frame already on screen at the first sampled time is not dropped. Seeking a millisecond late
+            # keeps a frame that starts exactly on a sampled time on it after rounding to the stream time base.
+            seek = start + first / fps - piece_start + 1e-3
+            seek_args = ["-noaccurate_seek", "-ss", f"{seek:.6f}", "-i", source]
+            add_source(seek_args, f"fps={fps}:round=up:start_time=0", last - first)
+    add_images()
+    n_sources = len(filters)
+    filters.append("".join(f"[s{i}]" for i in range(n_sources)) + f"concat=n={n_sources}:v=1:a=0[v0]")
+
+    n_overlays = 0
+    for sprite_file, (x, y), overlay_start, overlay_end in overlays:
+        first, last = first_frame(max(start, overlay_start)), first_frame(min(end, overlay_end))
+        if last <= first:
+            continue
+        args += ["-i", sprite_file]
+        enable = f"between(n,{first},{last - 1})"
+        filters.append(
+            f"[v{n_overlays}][{n_sources + n_overlays}:v]overlay=x={x}:y={y}:enable='{enable}'[v{n_overlays + 1}]"
+        )
+        n_overlays += 1
+
+    maps = ["-map", f"[v{n_overlays}]"]
+    if audio_file:
+        args += ["-i", audio_file]
+        maps += ["-map", f"{n_sources + n_overlays}:a", "-c:a", "aac"]
+
+    try:
+        await run_ffmpeg(
+            args
+            + ["-filter_complex", ";".join(filters)]
+            + maps
+            + ["-c:v", video_config.codec, "-threads", str(video_config.threads), "-pix_fmt", "yuv420p"]
+            + ["-r", str(fps), "-frames:v", str(span_frames(start, end, fps)), output_file]
+        )
+    finally:
+        list_dir.cleanup()
+
+
+async def encode_video(
+    report_frames: List[str],
+    image_files: List[str],
+    title: str,
+    subtitles: List[SubtitleBase],
+    video_config: VideoConfig,
+    output_file: str,
+    kline_video: Optional[str] = None,
+):
+    """Build the same timeline as ``create_video`` with ffmpeg filter graphs instead of moviepy.
+
+    The images are fed through concat-demuxer lists with per-image durations, the title and subtitles are
+    cached RGBA sprites overlaid for the title interval and while each narration plays, and the audio is muxed
+    from a track mixed beforehand.
+    With ``encode_workers`` other than 1 the timeline is cut at the title, report and subtitle boundaries,
+    the segments are encoded concurrently with identical settings and then joined without re-encoding.
+    """
+    width, height, fps = video_config.width, video_config.height, video_config.fps
+    interval = video_config.title.interval + video_config.report.interval
+    kline_duration = subtitles[-1].end_time
+    duration = interval + kline_duration
+
+    with tempfile.TemporaryDirectory(dir=os.path.dirname(os.path.abspath(output_file))) as work_dir:
+        # The title is shown over the first report frame faded into the white background.
+        title_background = os.path.join(work_dir, "title_background.png")
+        with Image.open(report_frames[0]) as report_image:
+            report_image = report_image.convert("RGB")
+            white = Image.new("RGB", report_image.size, (255, 255, 255))
+            Image.blend(white, report_image, video_config.title.bg_image_opacity).save(title_background)
+
+        pieces = [(title_background, 0, video_config.title.interval)]
+        report_duration = video_config.report.interval / len(report_frames)
+        for i, report_frame in enumerate(report_frames):
+            piece_start = video_config.title.interval + i * report_duration
+            pieces.append((report_frame, piece_start, piece_start + report_duration))
+        if kline_video:
+            pieces.append((kline_video, interval, duration))
+        else:
+            frame_duration = kline_duration / len(image_files)
+            for i, image_file in enumerate(image_files):
+                pieces.append((image_file, interval + i * frame_duration, interval + (i + 1) * frame_duration))
+
+        audio_file = os.path.join(work_dir, "audio.wav")
+        narration_durations = await mix_audio(subtitles, interval, duration, video_config, audio_file)
+
+        overlays = []
+        if title:
+            sprite_file, position = await create_subtitle_sprite(title, width, height, video_config.title)
+            overlays.append((sprite_file, position, 0, video_config.title.interval))
+        # Each subtitle is shown while its narration plays, not through the pause before the next one.
+        for subtitle, narration_duration in zip(subtitles, narration_durations):
+            sprite_file, position = await create_subtitle_sprite(subtitle.text, width, height, video_config.subtitle)
+            start = subtitle.start_time + interval
+            overlays.append((sprite_file, position, start, start + narration_duration))
+
+        workers = video_config.encode_workers or os.cpu_count()
+        if workers == 1:
+            logger.info(f"Encoding {duration:.1f}s video with ffmpeg")
+            await encode_span(pieces, overlays, 0, duration, video_config, output_file, audio_file)
+            return
+
+        boundaries = [0, video_config.title.interval, interval, duration]
+        boundaries += [subtitle.start_time + interval for subtitle in subtitles]
+        spans = segment_spans(boundaries, fps)
+        segment_files = [os.path.join(work_dir, f"segment_{i:03d}.mp4") for i in range(len(spans))]
+
+        logger.info(f"Encoding {duration:.1f}s video as {len(spans)} segments, {workers} at a time")
+        semaphore = asyncio.Semaphore(workers)
+
+        async def encode_segment(span: Tuple[float, float], segment_file: str):
+            async with semaphore:
+                await encode_span(pieces, overlays, span[0], span[1], video_config, segment_file)
+
+        await asyncio.gather(*[encode_segment(span, file) for span, file in zip(spans, segment_files)])
+
+        segment_list = os.path.join(work_dir, "segments.txt")
+        with open(segment_list, "w", encoding="utf-8") as f:
+            f.writelines(f"file '{_escape(segment_file)}'\n" for segment_file in segment_files)
+        await run_ffmpeg(
+            ["-f", "concat", "-safe", "0", "-i", segment_list, "-i", audio_file]
+            + ["-map", "0:v", "-map", "1:a", "-c:v", "copy", "-c:a", "aac", output_file]
+        )
@@ -3,9 +3,10 @@ import os
 from typing import List
 
 import mistune
-from pyppeteer import launch
 from tqdm import tqdm
 
+from utils.chart.browser import REPORT_SLOT, browser_service
+
 INITIAL_FONT_SIZE = 28
 MIN_FONT_SIZE = 18
 INITIAL_H1_FONT_SIZE = 56
@@ -16,6 +17,11 @@ HTML_TEMPLATE = """
 <html>
 <head>
 <style>
+:root {{
+    --opacity: 1;
+    --bg-opacity: 0;
+}}
+
 html, body {{
     margin: 0;
     padding: 0;
@@ -33,7 +39,7 @@ body::before {{
     height: 100%;
     background: url('data:image/png;base64,{encoded_string}') no-repeat center center;
     background-size: cover;
-    filter: opacity({bg_opacity});
+    filter: opacity(var(--bg-opacity));
     z-index: 0;
 }}
 
@@ -54,8 +60,7 @@ body::before {{
     font-size: {initial_font_size}px;
     line-height: 1.5;
     box-sizing: border-box;
-    opacity: {opacity};
-    transition: opacity 0.3s ease;
+    opacity: var(--opacity);
 }}
 
 h1 {{
@@ -83,7 +88,7 @@ p {{
 }}
 </style>
 <script>
-window.onload = function() {{
+function fitContent() {{
     const container = document.querySelector('.container');
     const containerHeight = container.scrollHeight;
     const containerTop = container.getBoundingClientRect().top;
@@ -107,7 +112,7 @@ window.onload = function() {{
             }});
         }}
     }}
-}};
+}}
 </script>
 </head>
 <body>
@@ -118,6 +123,13 @@ window.onload = function() {{
 </html>
 """
 
+SET_OPACITY_JS = """
+(opacity, bgOpacity) => {
+    document.documentElement.style.setProperty('--opacity', opacity);
+    document.documentElement.style.setProperty('--bg-opacity', bgOpacity);
+}
+"""
+
 
 async def generate_report_frames(
     md_text: str, background_image_path: str, output_dir: str, total_frames: int = 20
@@ -129,43 +141,37 @@ async def generate_report_frames(
 
     html_content = mistune.html(md_text)
 
-    browser = await launch(headless=True, args=["--no-sandbox", "--disable-setuid-sandbox"])
-    page = await browser.newPage()
-    await page.setViewport({"width": 1080, "height": 1920})
-
-    output_paths = []
-    for frame in tqdm(range(total_frames + 1), desc="Generating frames"):
-        output_path = os.path.join(output_dir, f"frame_{frame:03}.png")
-        if os.path.exists(output_path):
-            output_paths.append(output_path)
-            continue
-
-        progress = (frame / total_frames) ** 3
-        opacity = round(1.0 - progress, 3)
-        bg_opacity = round(progress, 3)
-
-        html = HTML_TEMPLATE.format(
-            encoded_string=encoded_string,
-            initial_font_size=INITIAL_FONT_SIZE,
-            min_font_size=MIN_FONT_SIZE,
-            initial_h1_font_size=INITIAL_H1_FONT_SIZE,
-            min_h1_font_size=MIN_H1_FONT_SIZE,
-            html_content=html_content,
-            opacity=opacity,
-            bg_opacity=bg_opacity,
-        )
-
-        temp_html_path = f"temp_frame_{frame:03}.html"
-        with open(temp_html_path, "w", encoding="utf-8") as f:
-            f.write(html)
-
-        await page.goto(f"file://{os.path.abspath(temp_html_path)}")
-        await page.waitForSelector(".container")
-
-        await page.screenshot({"path": output_path, "fullPage": True})
-
-        os.remove(temp_html_path)
-        output_paths.append(output_path)
-
-    await browser.close()
+    output_paths = [os.path.join(output_dir, f"frame_{frame:03}.png") for frame in range(total_frames + 1)]
+    if all(os.path.exists(output_path) for output_path in output_paths):
+        return output_paths
+
+    # The page is loaded and its font size fitted once, the frames only differ in the fade applied on top.
+    html = HTML_TEMPLATE.format(
+        encoded_string=encoded_string,
+        initial_font_size=INITIAL_FONT_SIZE,
+        min_font_size=MIN_FONT_SIZE,
+        initial_h1_font_size=INITIAL_H1_FONT_SIZE,
+        min_h1_font_size=MIN_H1_FONT_SIZE,
+        html_content=html_content,
+    )
+    async with browser_service.borrow(REPORT_SLOT) as browser:
+        page = await browser.newPage()
+        try:
+            await page.setViewport({"width": 1080, "height": 1920})
+            await page.setContent(html)
+            await page.waitForSelector(".container")
+            await page.evaluate("fitContent()", force_expr=True)
+
+            for frame, output_path in enumerate(tqdm(output_paths, desc="Generating frames")):
+                if os.path.exists(output_path):
+                    continue
+
+                progress = (frame / total_frames) ** 3
+                opacity = round(1.0 - progress, 3)
+                bg_opacity = round(progress, 3)
+
+                await page.evaluate(SET_OPACITY_JS, opacity, bg_opacity)
+                await page.screenshot({"path": output_path, "fullPage": True})
+        finally:
+            await page.close()
     return output_paths
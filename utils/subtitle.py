@@ -1,18 +1,43 @@
+import bisect
+import hashlib
+import json
+import os
 import re
+from functools import lru_cache
+from typing import Dict, List, Tuple
 
+import numpy as np
 from moviepy import TextClip
+from PIL import Image, ImageFont
 
 from utils.config import SubtitleConfig
 
+_glyph_widths: Dict[Tuple[str, int], Dict[str, float]] = {}
+
+
+@lru_cache(maxsize=None)
+def load_font(font: str, font_size: int) -> ImageFont.FreeTypeFont:
+    return ImageFont.truetype(font, font_size)
+
+
+def prefix_widths(text: str, font: str, font_size: int) -> List[float]:
+    """Return the rendered width of every prefix of ``text``, summed from a per-(font, size) glyph width table."""
+    widths = _glyph_widths.setdefault((font, font_size), {})
+    prefix = [0.0]
+    for char in text:
+        width = widths.get(char)
+        if width is None:
+            width = widths[char] = load_font(font, font_size).getlength(char)
+        prefix.append(prefix[-1] + width)
+    return prefix
+
 
 async def find_split_index(current_line: str, font: str, font_size: int, max_width: int) -> int:
-    split_index = len(current_line)
-    for i in range(len(current_line) - 1, 0, -1):
-        temp_clip = TextClip(font, current_line[:i], font_size=font_size)
-        if temp_clip.size[0] <= max_width:
-            split_index = i
-            break
-    return split_index
+    # The longest proper prefix that still fits, or the whole line when not even one character does.
+    split_index = bisect.bisect_right(prefix_widths(current_line, font, font_size), max_width) - 1
+    if split_index > 0:
+        return min(split_index, len(current_line) - 1)
+    return len(current_line)
 
 
 async def wrap_text_by_punctuation_and_width(text: str, max_width: int, font: str, font_size: int) -> TextClip:
@@ -33,8 +58,7 @@ async def wrap_text_by_punctuation_and_width(text: str, max_width: int, font: st
         current_line += word
 
         while current_line:
-            temp_clip = TextClip(font, current_line, font_size=font_size)
-            if temp_clip.size[0] <= max_width:
+            if prefix_widths(current_line, font, font_size)[-1] <= max_width:
                 break
             else:
                 split_index = await find_split_index(current_line, font, font_size, max_width)
@@ -85,3 +109,36 @@ async def create_subtitle(
     )
     txt_clip = txt_clip.with_position(("center", subtitle_position - txt_clip.size[1] // 2))
     return txt_clip
+
+
+async def create_subtitle_sprite(
+    text: str,
+    video_width: int,
+    video_height: int,
+    subtitle_config: SubtitleConfig,
+    cache_dir: str = "cache/sprites",
+) -> Tuple[str, Tuple[int, int]]:
+    """Return an RGBA PNG of the subtitle and the top-left position it is placed at.
+
+    Sprites are rasterized once, with stroke and background applied, and cached by everything that affects
+    their pixels, so reruns and videos sharing a title style reuse them.
+    """
+    style = subtitle_config.model_dump(exclude={"interval", "position_ratio", "bg_image_opacity"})
+    payload = json.dumps([text, video_width, style], ensure_ascii=False, sort_keys=True)
+    sprite_file = os.path.join(cache_dir, f"{hashlib.sha256(payload.encode('utf-8')).hexdigest()}.png")
+
+    if not os.path.exists(sprite_file):
+        text_clip = await create_subtitle(text, video_width, video_height, subtitle_config)
+        rgb = text_clip.get_frame(0)
+        alpha = text_clip.mask.get_frame(0) if text_clip.mask is not None else np.ones(rgb.shape[:2])
+        sprite = Image.fromarray(np.dstack([rgb, np.round(alpha * 255)]).astype(np.uint8), "RGBA")
+
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_file = f"{sprite_file}.{os.getpid()}.tmp"
+        sprite.save(tmp_file, format="PNG")
+        os.replace(tmp_file, sprite_file)
+
+    with Image.open(sprite_file) as sprite:
+        width, height = sprite.size
+    subtitle_position = int(video_height * subtitle_config.position_ratio)
+    return sprite_file, ((video_width - width) // 2, subtitle_position - height // 2)
@@ -1,24 +1,32 @@
-from typing import List
+import os
+import tempfile
+from typing import List, Optional
 
 from moviepy import (
     AudioFileClip,
     ColorClip,
-    CompositeAudioClip,
     CompositeVideoClip,
     ImageClip,
+    VideoFileClip,
     concatenate_videoclips,
 )
 from tqdm import tqdm
 
 from core.schemas import SubtitleBase
-from utils.config import VideoConfig
-from utils.subtitle import create_subtitle
+from utils.audio import mix_audio
+from utils.config import SubtitleConfig, VideoConfig, VideoEncoder
+from utils.subtitle import create_subtitle_sprite
 
 
 def add_image_clips(image_files: List[str], duration: float) -> List[ImageClip]:
     return [ImageClip(image_file).with_duration(duration / len(image_files)) for image_file in image_files]
 
 
+async def subtitle_clip(text: str, video_width: int, video_height: int, subtitle_config: SubtitleConfig) -> ImageClip:
+    sprite_file, position = await create_subtitle_sprite(text, video_width, video_height, subtitle_config)
+    return ImageClip(sprite_file, transparent=True).with_position(position)
+
+
 async def create_video(
     report_frames: List[str],
     image_files: List[str],
@@ -26,7 +34,14 @@ async def create_video(
     subtitles: List[SubtitleBase],
     video_config: VideoConfig,
     output_file: str,
+    kline_video: Optional[str] = None,
 ):
+    if video_config.encoder == VideoEncoder.ffmpeg:
+        from utils.encoder import encode_video
+
+        await encode_video(report_frames, image_files, title, subtitles, video_config, output_file, kline_video)
+        return
+
     background = ColorClip(size=(video_config.width, video_config.height), color=(255, 255, 255)).with_duration(
         video_config.title.interval
     )
@@ -37,39 +52,37 @@ async def create_video(
         .with_opacity(video_config.title.bg_image_opacity)
     ]
     frames.extend(add_image_clips(report_frames, video_config.report.interval))
-    frames.extend(add_image_clips(image_files, subtitles[-1].end_time))
+    if kline_video:
+        frames.append(VideoFileClip(kline_video).with_duration(subtitles[-1].end_time))
+    else:
+        frames.extend(add_image_clips(image_files, subtitles[-1].end_time))
 
     video = concatenate_videoclips(frames, method="compose")
 
-    text_clips = []
-    audio_clips = []
     interval = video_config.title.interval + video_config.report.interval
+    final_duration = interval + subtitles[-1].end_time
 
+    text_clips = []
     if title:
-        text_clip = await create_subtitle(title, video.size[0], video.size[1], video_config.title)
+        text_clip = await subtitle_clip(title, video.size[0], video.size[1], video_config.title)
         text_clip = text_clip.with_duration(video_config.title.interval)
         text_clips.append(text_clip)
 
-    for subtitle in tqdm(subtitles, desc="Creating subtitles"):
-        audio = AudioFileClip(subtitle.audio_file)
-
-        text_clip = await create_subtitle(subtitle.text, video.size[0], video.size[1], video_config.subtitle)
-        text_clip = text_clip.with_duration(audio.duration).with_start(subtitle.start_time + interval)
-        text_clips.append(text_clip)
+    with tempfile.TemporaryDirectory(dir=os.path.dirname(os.path.abspath(output_file))) as work_dir:
+        # The whole soundtrack is mixed up front so the encode loop only reads one pre-rendered track.
+        audio_file = os.path.join(work_dir, "audio.wav")
+        narration_durations = await mix_audio(subtitles, interval, final_duration, video_config, audio_file)
 
-        audio_clip = audio.with_start(subtitle.start_time + interval)
-        audio_clips.append(audio_clip)
+        for subtitle, narration_duration in tqdm(
+            zip(subtitles, narration_durations), desc="Creating subtitles", total=len(subtitles)
+        ):
+            text_clip = await subtitle_clip(subtitle.text, video.size[0], video.size[1], video_config.subtitle)
+            text_clip = text_clip.with_duration(narration_duration).with_start(subtitle.start_time + interval)
+            text_clips.append(text_clip)
 
-    if video_config.background_audio:
-        final_duration = interval + subtitles[-1].end_time
-        bg_audio = AudioFileClip(video_config.background_audio).with_duration(final_duration)
-        bg_audio = bg_audio.with_volume_scaled(video_config.background_audio_volume)
-        audio_clips.insert(0, bg_audio)
+        final_video = CompositeVideoClip([background, video] + text_clips)
+        final_video = final_video.with_audio(AudioFileClip(audio_file))
 
-    final_video = CompositeVideoClip([background, video] + text_clips)
-    final_audio = CompositeAudioClip(audio_clips)
-    final_video = final_video.with_audio(final_audio)
-
-    final_video.write_videofile(
-        output_file, fps=video_config.fps, codec=video_config.codec, threads=video_config.threads
-    )
+        final_video.write_videofile(
+            output_file, fps=video_config.fps, codec=video_config.codec, threads=video_config.threads
+        )